@@ -25,23 +25,29 @@ dag = DAG(
     tags = ['football', 'elt', 'dbt'],
 )
 # task 1 : Extract from API 
-def extract_football_data(**context):
-    from foot_data import fetch_competitions, fetch_matches_save
+def extract_competitions(**context):
+    from foot_data import fetch_competitions
     print("🏆 Fetching competitions...")
     fetch_competitions()
-    
-    print("⚽ Fetching matches 2023...")
-    fetch_matches_save(season=2023)
-    
-    print("⚽ Fetching matches 2024...")
-    fetch_matches_save(season=2024)
-    
-    print("✅ Extraction completed")
+
+def extract_season_matches(season, **context):
+    from foot_data import fetch_matches_save
+    print(f"⚽ Fetching matches {season}...")
+    fetch_matches_save(season=season)
+    print(f"✅ Extraction {season} completed")
 extract_task = PythonOperator(
-    task_id = 'extract_football_data',
-    python_callable = extract_football_data,
+    task_id = 'extract_competitions',
+    python_callable = extract_competitions,
     dag = dag,
 )
+# une instance par saison, limitée par le pool de l'API
+extract_matches_task = PythonOperator.partial(
+    task_id = 'extract_season_matches',
+    python_callable = extract_season_matches,
+    pool = 'football_api',
+    pool_slots = 1,
+    dag = dag,
+).expand(op_kwargs = [{'season': 2023}, {'season': 2024}])
 # Task 2 : load to postgresql bronze
 def load_to_bronze(**context):
     from load_postgres import load_parquet_to_postgres
@@ -55,23 +61,26 @@ load_bronze_task= PythonOperator(
     python_callable = load_to_bronze,
     dag = dag,
 )
-# Task 3 : DBT : transformation bronze - Gold
+# Task 3 : DBT : transformation bronze - Gold (pool 'dbt' à 1 slot, pas de concurrence avec l'extraction)
 dbt_run = BashOperator(
     task_id = 'dbt_transformation',
     bash_command ='cd /opt/airflow/dbt_football/stat_foot && dbt run --profiles-dir /home/airflow/.dbt --target docker',
+    pool = 'dbt',
     dag = dag,
 )
 # task 4 : DBT : run test
 dbt_test = BashOperator(
     task_id = 'db_test',
     bash_command = 'cd /opt/airflow/dbt_football/stat_foot && dbt test --profiles-dir /home/airflow/.dbt --target docker',
+    pool = 'dbt',
     dag = dag,
 )
 # task 5 : DBT : generate doc 
 dbt_doc = BashOperator(
     task_id = 'dbt_docs_generate',
     bash_command = 'cd /opt/airflow/dbt_football/stat_foot && dbt docs generate --profiles-dir /home/airflow/.dbt --target docker',
+    pool = 'dbt',
     dag= dag,
 )
-extract_task >> load_bronze_task >> dbt_run >> dbt_test >> dbt_doc
+extract_task >> extract_matches_task >> load_bronze_task >> dbt_run >> dbt_test >> dbt_doc
     
\ No newline at end of file
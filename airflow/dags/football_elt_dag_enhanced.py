@@ -4,14 +4,16 @@ Enhanced Football ELT DAG with Monitoring, Error Handling, and Data Quality Chec
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 from airflow.operators.bash import BashOperator
-from airflow.operators.empty import EmptyOperator
 from airflow.utils.task_group import TaskGroup
 from airflow.models import Variable
 from airflow.utils.email import send_email
 from datetime import datetime, timedelta
+from pathlib import Path
 import sys
 import os
 import logging
+import hashlib
+import pyarrow.parquet as pq
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +22,40 @@ logger = logging.getLogger(__name__)
 # Add extractor to path
 sys.path.append('/opt/airflow/extractor')
 
+# Extraction scope
+LEAGUES = ['PL', 'FL1', 'PD']
+SEASONS = [2023, 2024]
+
+# Airflow pool capping concurrent football-data.org requests
+API_POOL = 'football_api'
+
+# Default Airflow pool for pipeline tasks
+ELT_POOL = 'elt_pool'
+
+# Single-slot pool so dbt invocations never contend with extraction
+DBT_POOL = 'dbt'
+
+# dbt artifacts from the previous build attempt, used for retry selection
+DBT_STATE_DIR = '/opt/airflow/dbt_state'
+
+def send_pipeline_notification(context):
+    """Send custom notification on failure"""
+    task_instance = context.get('task_instance')
+    task_id = task_instance.task_id
+    dag_id = task_instance.dag_id
+    execution_date = context.get('execution_date')
+    
+    subject = f"Airflow Alert: {dag_id}.{task_id} Failed"
+    body = f"""
+    Task Failed:
+    - DAG: {dag_id}
+    - Task: {task_id}
+    - Execution Date: {execution_date}
+    - Log URL: {task_instance.log_url}
+    """
+    logger.error(body)
+
+
 # Default arguments
 default_args = {
     'owner': 'data_engineering',
@@ -30,6 +66,9 @@ default_args = {
     'retries': 2,
     'retry_delay': timedelta(minutes=5),
     'execution_timeout': timedelta(hours=2),
+    # Inherited by every task instead of per-operator callbacks
+    'on_failure_callback': send_pipeline_notification,
+    'pool': ELT_POOL,
 }
 
 # DAG definition
@@ -45,56 +84,63 @@ dag = DAG(
 )
 
 
-def send_pipeline_notification(context):
-    """Send custom notification on failure"""
-    task_instance = context.get('task_instance')
-    task_id = task_instance.task_id
-    dag_id = task_instance.dag_id
-    execution_date = context.get('execution_date')
-    
-    subject = f"Airflow Alert: {dag_id}.{task_id} Failed"
-    body = f"""
-    Task Failed:
-    - DAG: {dag_id}
-    - Task: {task_id}
-    - Execution Date: {execution_date}
-    - Log URL: {task_instance.log_url}
-    """
-    logger.error(body)
-
-
 # ============================================================================
 # EXTRACTION TASKS
 # ============================================================================
 
-def extract_football_data(**context):
-    """Extract data from Football API"""
+def fetch_competitions(**context):
+    """Extract competitions from Football API"""
     from foot_data_enhanced import FootballDataExtractor
     
-    logger.info("🏆 Starting data extraction...")
+    logger.info("🏆 Fetching competitions...")
     
     extractor = FootballDataExtractor()
     
     try:
-        # Fetch competitions
-        logger.info("Fetching competitions...")
         competitions_df = extractor.fetch_competitions()
         context['ti'].xcom_push(key='competitions_count', value=len(competitions_df))
-        
-        # Fetch matches
-        logger.info("Fetching matches for all leagues and seasons...")
-        matches_df = extractor.fetch_all_matches(
-            leagues=['PL', 'FL1', 'PD'],
-            seasons=[2023, 2024]
+        return len(competitions_df)
+    finally:
+        extractor.close()
+
+
+def fetch_league_season(league, season, **context):
+    """Extract matches for one league and season (mapped task).
+    
+    A failed request fails this mapped instance; the saved path is returned
+    through XCom so combine_matches only reads this run's files.
+    """
+    from foot_data_enhanced import FootballDataExtractor
+    
+    logger.info(f"⚽ Fetching matches for {league} - {season}...")
+    
+    extractor = FootballDataExtractor()
+    
+    try:
+        return extractor.fetch_and_save_league(league, season)
+    finally:
+        extractor.close()
+
+
+def combine_matches(**context):
+    """Combine mapped league/season extractions into season files"""
+    from foot_data_enhanced import FootballDataExtractor
+    
+    extractor = FootballDataExtractor()
+    
+    try:
+        # One return value per mapped instance: a path, or None for an empty season
+        paths = context['ti'].xcom_pull(task_ids='extraction.fetch_league_season') or []
+        matches_count = extractor.combine_league_files(
+            paths=[path for path in paths if path], seasons=SEASONS
         )
-        context['ti'].xcom_push(key='matches_count', value=len(matches_df))
+        context['ti'].xcom_push(key='matches_count', value=matches_count)
         
-        logger.info(f"✅ Extraction completed: {len(matches_df)} matches extracted")
+        logger.info(f"✅ Extraction completed: {matches_count} matches extracted")
         
         return {
             'status': 'success',
-            'competitions_count': len(competitions_df),
-            'matches_count': len(matches_df)
+            'matches_count': matches_count
         }
         
     except Exception as e:
@@ -106,9 +152,6 @@ def extract_football_data(**context):
 
 def validate_extracted_data(**context):
     """Validate extracted data before loading"""
-    from pathlib import Path
-    import pandas as pd
-    
     logger.info("🔍 Validating extracted data...")
     
     data_dir = Path('/opt/airflow/data/landing')
@@ -119,6 +162,7 @@ def validate_extracted_data(**context):
     ]
     
     validation_results = {}
+    file_metadata = {}
     
     for file_name in required_files:
         file_path = data_dir / file_name
@@ -128,18 +172,29 @@ def validate_extracted_data(**context):
             validation_results[file_name] = 'MISSING'
         else:
             try:
-                df = pd.read_parquet(file_path)
-                if df.empty:
+                # Footer only: row count and schema without decoding any data page
+                parquet_file = pq.ParquetFile(file_path)
+                num_rows = parquet_file.metadata.num_rows
+                num_columns = len(parquet_file.schema_arrow)
+                file_metadata[file_name] = {
+                    'num_rows': num_rows,
+                    'schema_fingerprint': hashlib.sha256(
+                        parquet_file.schema_arrow.serialize().to_pybytes()
+                    ).hexdigest(),
+                }
+                if num_rows == 0:
                     logger.warning(f"⚠️ Empty file: {file_name}")
                     validation_results[file_name] = 'EMPTY'
                 else:
-                    logger.info(f"✅ Valid file: {file_name} ({len(df)} rows)")
-                    validation_results[file_name] = f'OK ({len(df)} rows)'
+                    logger.info(f"✅ Valid file: {file_name} ({num_rows} rows, {num_columns} columns)")
+                    validation_results[file_name] = f'OK ({num_rows} rows)'
             except Exception as e:
                 logger.error(f"❌ Corrupted file: {file_name} - {str(e)}")
                 validation_results[file_name] = 'CORRUPTED'
     
     context['ti'].xcom_push(key='validation_results', value=validation_results)
+    # Footer metadata for the load step, so it never has to reopen the files to plan
+    context['ti'].xcom_push(key='file_metadata', value=file_metadata)
     
     # Fail if any critical file is missing or corrupted
     if any(status in ['MISSING', 'CORRUPTED'] for status in validation_results.values()):
@@ -151,15 +206,27 @@ def validate_extracted_data(**context):
 
 with dag:
     
-    start = EmptyOperator(task_id='start')
-    
     # Extraction group
     with TaskGroup('extraction', tooltip='Extract data from API') as extraction_group:
         
-        extract_task = PythonOperator(
-            task_id='extract_football_data',
-            python_callable=extract_football_data,
-            on_failure_callback=send_pipeline_notification,
+        competitions_task = PythonOperator(
+            task_id='fetch_competitions',
+            python_callable=fetch_competitions,
+        )
+        
+        # One mapped instance per league/season, throttled by the API pool
+        matches_tasks = PythonOperator.partial(
+            task_id='fetch_league_season',
+            python_callable=fetch_league_season,
+            pool=API_POOL,
+            pool_slots=1,
+        ).expand(
+            op_kwargs=[{'league': league, 'season': season} for league in LEAGUES for season in SEASONS]
+        )
+        
+        combine_task = PythonOperator(
+            task_id='combine_matches',
+            python_callable=combine_matches,
         )
         
         validate_task = PythonOperator(
@@ -167,7 +234,7 @@ with dag:
             python_callable=validate_extracted_data,
         )
         
-        extract_task >> validate_task
+        competitions_task >> matches_tasks >> combine_task >> validate_task
     
     # ============================================================================
     # LOADING TASKS
@@ -179,11 +246,30 @@ with dag:
         
         logger.info("📥 Loading data to Bronze layer...")
         
+        file_metadata = context['ti'].xcom_pull(
+            task_ids='extraction.validate_extracted_data', key='file_metadata'
+        ) or {}
+        
+        # Only seasons whose file validated with rows; all must share one schema
+        # since they are appended into the same staging table
+        season_files = {
+            season: file_metadata.get(f'all_matches_{season}.parquet') for season in SEASONS
+        }
+        seasons = [season for season, meta in season_files.items() if meta and meta['num_rows'] > 0]
+        fingerprints = {season_files[season]['schema_fingerprint'] for season in seasons}
+        if len(fingerprints) > 1:
+            # Fail before touching the database rather than mid-COPY
+            logger.error(f"❌ Season files have differing schemas: {seasons}")
+            raise ValueError(f"Season files have differing schemas: {seasons}")
+        expected_rows = sum(season_files[season]['num_rows'] for season in seasons)
+        
         loader = PostgreSQLLoader()
         
         try:
             # Load matches
-            total_rows = loader.load_all_matches(seasons=[2023, 2024])
+            total_rows = loader.load_all_matches(seasons=seasons)
+            if total_rows != expected_rows:
+                logger.warning(f"⚠️ Loaded {total_rows} rows, parquet footers report {expected_rows}")
             
             # Load competitions
             try:
@@ -213,14 +299,17 @@ with dag:
     load_bronze_task = PythonOperator(
         task_id='load_to_bronze',
         python_callable=load_to_bronze,
-        on_failure_callback=send_pipeline_notification,
     )
     
     # ============================================================================
     # DBT TRANSFORMATION TASKS
     # ============================================================================
     
-    with TaskGroup('dbt_transformation', tooltip='DBT transformations') as dbt_group:
+    with TaskGroup(
+        'dbt_transformation',
+        tooltip='DBT transformations',
+        default_args={'pool': DBT_POOL},
+    ) as dbt_group:
         
         # Clean old artifacts
         dbt_clean = BashOperator(
@@ -234,18 +323,22 @@ with dag:
             bash_command='cd /opt/airflow/dbt_football/stat_foot && dbt deps --profiles-dir /home/airflow/.dbt',
         )
         
-        # Run transformations
-        dbt_run = BashOperator(
-            task_id='dbt_run',
-            bash_command='cd /opt/airflow/dbt_football/stat_foot && dbt run --profiles-dir /home/airflow/.dbt',
-            on_failure_callback=send_pipeline_notification,
-        )
-        
-        # Test data quality
-        dbt_test = BashOperator(
-            task_id='dbt_test',
-            bash_command='cd /opt/airflow/dbt_football/stat_foot && dbt test --profiles-dir /home/airflow/.dbt',
-            on_failure_callback=send_pipeline_notification,
+        # Run transformations and data quality tests in a single graph pass.
+        # Bronze is reloaded every run, so the first try builds everything;
+        # Airflow retries only rebuild nodes that errored or failed last time.
+        dbt_build = BashOperator(
+            task_id='dbt_build',
+            bash_command=(
+                'cd /opt/airflow/dbt_football/stat_foot && '
+                '{% if ti.try_number > 1 %}'
+                f'if [ -f {DBT_STATE_DIR}/run_results.json ]; then '
+                f'SELECTOR="--select result:error+ result:fail+ --defer --state {DBT_STATE_DIR}"; fi; '
+                '{% endif %}'
+                'dbt build $SELECTOR --profiles-dir /home/airflow/.dbt; status=$?; '
+                f'mkdir -p {DBT_STATE_DIR} && '
+                f'cp target/manifest.json target/run_results.json {DBT_STATE_DIR}/ 2>/dev/null; '
+                'exit $status'
+            ),
         )
         
         # Generate documentation
@@ -254,7 +347,7 @@ with dag:
             bash_command='cd /opt/airflow/dbt_football/stat_foot && dbt docs generate --profiles-dir /home/airflow/.dbt',
         )
         
-        dbt_clean >> dbt_deps >> dbt_run >> dbt_test >> dbt_docs
+        dbt_clean >> dbt_deps >> dbt_build >> dbt_docs
     
     # ============================================================================
     # DATA QUALITY CHECKS
@@ -270,36 +363,33 @@ with dag:
         results = {}
         
         try:
-            # Check 1: Verify gold tables exist and have data
-            for table in ['fact_matches', 'dim_teams', 'agg_team_performance', 'agg_competition_stats']:
-                try:
-                    stats = loader.get_table_stats('gold', table)
-                    results[table] = stats
-                    
-                    if stats.get('row_count', 0) == 0:
-                        logger.warning(f"⚠️ Table {table} is empty")
-                except Exception as e:
-                    logger.error(f"❌ Failed to check table {table}: {e}")
-                    results[table] = {'error': str(e)}
+            # All checks share one pooled connection
+            with loader.connection() as conn:
+                # Check 1: Verify gold tables exist and have data
+                for table in ['fact_matches', 'dim_teams', 'agg_team_performance', 'agg_competition_stats']:
+                    try:
+                        stats = loader.get_table_stats('gold', table, conn=conn)
+                        results[table] = stats
+                        
+                        if stats.get('row_count', 0) == 0:
+                            logger.warning(f"⚠️ Table {table} is empty")
+                    except Exception as e:
+                        logger.error(f"❌ Failed to check table {table}: {e}")
+                        results[table] = {'error': str(e)}
+                
+                # Check 2 & 3: Verify data freshness and key metrics in one round-trip
+                query = """
+                SELECT 
+                    MAX(loaded_at) as last_load,
+                    COUNT(DISTINCT match_id) as total_matches,
+                    COUNT(DISTINCT home_team_id) as unique_teams,
+                    SUM(total_goals) as total_goals
+                FROM gold.fact_matches
+                """
+                metrics = loader.execute_query(query, conn=conn).iloc[0].to_dict()
             
-            # Check 2: Verify data freshness
-            query = """
-            SELECT MAX(loaded_at) as last_load
-            FROM gold.fact_matches
-            """
-            freshness = loader.execute_query(query)
-            results['data_freshness'] = str(freshness.iloc[0]['last_load'])
-            
-            # Check 3: Verify key metrics
-            query = """
-            SELECT 
-                COUNT(DISTINCT match_id) as total_matches,
-                COUNT(DISTINCT home_team_id) as unique_teams,
-                SUM(total_goals) as total_goals
-            FROM gold.fact_matches
-            """
-            metrics = loader.execute_query(query)
-            results['key_metrics'] = metrics.iloc[0].to_dict()
+            results['data_freshness'] = str(metrics.pop('last_load'))
+            results['key_metrics'] = metrics
             
             context['ti'].xcom_push(key='quality_check_results', value=results)
             
@@ -326,7 +416,7 @@ with dag:
         """Send pipeline success report"""
         ti = context['ti']
         
-        matches_count = ti.xcom_pull(task_ids='extraction.extract_football_data', key='matches_count')
+        matches_count = ti.xcom_pull(task_ids='extraction.combine_matches', key='matches_count')
         bronze_stats = ti.xcom_pull(task_ids='load_to_bronze', key='bronze_stats')
         quality_results = ti.xcom_pull(task_ids='data_quality_checks', key='quality_check_results')
         
@@ -345,10 +435,8 @@ with dag:
         python_callable=send_success_report,
     )
     
-    end = EmptyOperator(task_id='end')
-    
     # ============================================================================
     # DAG FLOW
     # ============================================================================
     
-    start >> extraction_group >> load_bronze_task >> dbt_group >> quality_check_task >> success_report >> end
+    extraction_group >> load_bronze_task >> dbt_group >> quality_check_task >> success_report
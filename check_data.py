@@ -22,13 +22,14 @@ min_date, max_date = cur.fetchone()
 print(f'📅 Période des matchs: {min_date} → {max_date}')
 
 # Compter par saison
+# match_year est une colonne générée indexée (voir extractor/load_postgres.py)
 cur.execute("""
     SELECT 
-        EXTRACT(YEAR FROM "utcDate"::timestamp) as year,
+        match_year as year,
         COUNT(*) as nb_matches
     FROM bronze.all_matches
-    GROUP BY year
-    ORDER BY year
+    GROUP BY match_year
+    ORDER BY match_year
 """)
 print('\n📈 Matchs par année:')
 for row in cur.fetchall():
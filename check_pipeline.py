@@ -1,4 +1,5 @@
 import psycopg2
+from psycopg2 import sql
 
 conn = psycopg2.connect(
     host='localhost', 
@@ -20,41 +21,32 @@ cur.execute("""
 schemas = [row[0] for row in cur.fetchall()]
 print('📂 Schémas disponibles:', ', '.join(schemas))
 
-# Tables bronze
+# Tables des trois couches, comptées en une seule requête
 cur.execute("""
-    SELECT table_name 
-    FROM information_schema.tables 
-    WHERE table_schema = 'bronze'
+    SELECT table_schema, table_name
+    FROM information_schema.tables
+    WHERE table_schema IN ('bronze', 'silver', 'gold')
+    ORDER BY table_schema, table_name
 """)
-print('\n🟤 Tables BRONZE:')
-for row in cur.fetchall():
-    cur.execute(f'SELECT COUNT(*) FROM bronze.{row[0]}')
-    count = cur.fetchone()[0]
-    print(f'  • {row[0]}: {count} lignes')
-
-# Tables silver
-cur.execute("""
-    SELECT table_name 
-    FROM information_schema.tables 
-    WHERE table_schema = 'silver'
-""")
-print('\n⚪ Tables SILVER:')
-for row in cur.fetchall():
-    cur.execute(f'SELECT COUNT(*) FROM silver.{row[0]}')
-    count = cur.fetchone()[0]
-    print(f'  • {row[0]}: {count} lignes')
-
-# Tables gold
-cur.execute("""
-    SELECT table_name 
-    FROM information_schema.tables 
-    WHERE table_schema = 'gold'
-""")
-print('\n🟡 Tables GOLD:')
-for row in cur.fetchall():
-    cur.execute(f'SELECT COUNT(*) FROM gold.{row[0]}')
-    count = cur.fetchone()[0]
-    print(f'  • {row[0]}: {count} lignes')
+tables = cur.fetchall()
+
+counts = {}
+if tables:
+    count_query = sql.SQL(' UNION ALL ').join(
+        sql.SQL('SELECT {}, {}, (SELECT COUNT(*) FROM {}.{})').format(
+            sql.Literal(schema), sql.Literal(table),
+            sql.Identifier(schema), sql.Identifier(table)
+        )
+        for schema, table in tables
+    )
+    cur.execute(count_query)
+    for schema, table, count in cur.fetchall():
+        counts.setdefault(schema, []).append((table, count))
+
+for schema, label in [('bronze', '🟤 Tables BRONZE:'), ('silver', '⚪ Tables SILVER:'), ('gold', '🟡 Tables GOLD:')]:
+    print(f'\n{label}')
+    for table, count in counts.get(schema, []):
+        print(f'  • {table}: {count} lignes')
 
 # Exemple de données gold
 print('\n📊 Exemple: Top 5 équipes (gold.mart_team_stats):')
@@ -3,6 +3,7 @@ Configuration Management Module
 Centralized configuration for the Football ELT Pipeline
 """
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 from dataclasses import dataclass
@@ -140,9 +141,11 @@ class Config:
         self.paths = PathConfig.from_env()
         self.logging = LoggingConfig.from_env()
         self.pipeline = PipelineConfig.from_env()
-        
-        # Ensure directories exist
+    
+    def initialize(self):
+        """Create data and log directories (call from tasks, not at import)"""
         self.paths.ensure_dirs()
+        return self
     
     def validate(self) -> bool:
         """Validate configuration"""
@@ -162,33 +165,36 @@ class Config:
         return True
 
 
-# Global configuration instance
-config = Config()
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Get the process-wide configuration instance"""
+    return Config()
 
 
 # Convenience functions
 def get_db_connection_string() -> str:
     """Get database connection string"""
-    return config.database.connection_string
+    return get_config().database.connection_string
 
 
 def get_api_headers() -> dict:
     """Get API headers"""
-    return config.api.headers
+    return get_config().api.headers
 
 
 def get_landing_dir() -> Path:
     """Get landing directory path"""
-    return config.paths.landing_dir
+    return get_config().paths.landing_dir
 
 
 def get_logs_dir() -> Path:
     """Get logs directory path"""
-    return config.paths.logs_dir
+    return get_config().paths.logs_dir
 
 
 if __name__ == "__main__":
     # Test configuration
+    config = get_config().initialize()
     print("=== Configuration Test ===")
     print(f"Database: {config.database.database}")
     print(f"API Base URL: {config.api.base_url}")
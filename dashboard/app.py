@@ -4,10 +4,12 @@ Production-ready dashboard for football analytics
 """
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from sqlalchemy import create_engine, text
 import os
+import urllib.request
 from dotenv import load_dotenv
 from datetime import datetime
 
@@ -48,9 +50,8 @@ st.markdown("""
 load_dotenv()
 
 # Database connection
-@st.cache_resource
-def get_database_connection():
-    """Create database connection"""
+def get_connection_string():
+    """Build PostgreSQL connection string from environment"""
     db_config = {
         'host': os.getenv('DB_HOST', 'localhost'),
         'port': os.getenv('DB_PORT', '5432'),
@@ -59,47 +60,53 @@ def get_database_connection():
         'password': os.getenv('DB_PASS')
     }
     
-    conn_string = (
+    return (
         f"postgresql://{db_config['user']}:{db_config['password']}"
         f"@{db_config['host']}:{db_config['port']}/{db_config['database']}"
     )
-    
-    return create_engine(conn_string)
 
 
-@st.cache_data(ttl=3600)
-def load_data(query: str):
-    """Load data from database with caching"""
+@st.cache_resource
+def get_database_connection():
+    """Create database connection"""
+    return create_engine(get_connection_string())
+
+
+def load_snapshot(queries: dict) -> dict:
+    """Run several queries against one consistent snapshot of the database"""
+    engine = get_database_connection()
+    # One REPEATABLE READ transaction: a dbt run rebuilding gold mid-read
+    # cannot mix old and new tables into one result set
+    with engine.connect().execution_options(
+        isolation_level="REPEATABLE READ", postgresql_readonly=True
+    ) as conn:
+        return {name: pd.read_sql(text(query), conn) for name, query in queries.items()}
+
+
+def load_data_with_params(query: str, params: dict):
+    """Load data from a parameterized query"""
     engine = get_database_connection()
     with engine.connect() as conn:
-        return pd.read_sql(text(query), conn)
+        return pd.read_sql(text(query), conn, params=params)
 
 
 # ============================================================================
 # DATA LOADING QUERIES
 # ============================================================================
 
-def get_competition_stats():
-    """Get competition statistics"""
-    query = """
+# Largest number of recent matches any page displays
+RECENT_MATCHES_LIMIT = 20
+
+GOLD_QUERIES = {
+    'competition_stats': """
     SELECT * FROM gold.agg_competition_stats
     ORDER BY match_year DESC, competition_code
-    """
-    return load_data(query)
-
-
-def get_team_performance():
-    """Get team performance statistics"""
-    query = """
+    """,
+    'team_performance': """
     SELECT * FROM gold.agg_team_performance
     ORDER BY total_points DESC, goal_difference DESC
-    """
-    return load_data(query)
-
-
-def get_recent_matches(limit=20):
-    """Get recent matches"""
-    query = f"""
+    """,
+    'recent_matches': f"""
     SELECT 
         match_date,
         competition_name,
@@ -107,17 +114,64 @@ def get_recent_matches(limit=20):
         away_team_name,
         fulltime_home_score,
         fulltime_away_score,
+        CONCAT_WS(' ', home_team_name, fulltime_home_score, '-', fulltime_away_score, away_team_name) AS "Match",
         match_outcome
     FROM gold.fact_matches
     ORDER BY match_date DESC
-    LIMIT {limit}
-    """
-    return load_data(query)
+    LIMIT {RECENT_MATCHES_LIMIT}
+    """,
+}
+
+
+def downcast_counts(df):
+    """Shrink integer columns (matches, wins, points, scores) to the smallest fitting type"""
+    for col in df.select_dtypes(include='integer').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def gold_version():
+    """Timestamp of the current gold load; gold-backed caches are keyed on it"""
+    # Same freshness column the pipeline's data quality checks read
+    query = "SELECT MAX(loaded_at) AS loaded_at FROM gold.fact_matches"
+    return str(load_data_with_params(query, {}).iloc[0, 0])
+
+
+@st.cache_resource(ttl=3600, max_entries=2)
+def warm_gold(version):
+    """Preload all gold aggregates of one load at once, sharing a single cache entry"""
+    return {name: downcast_counts(df) for name, df in load_snapshot(GOLD_QUERIES).items()}
+
+
+# Getters are cached per argument set; cache_data hands each rerun its own
+# copy, so pages can mutate the frames without touching warm_gold().
+# The two full gold aggregates only change when the ETL runs, so they are
+# persisted to disk to survive app restarts. Keying them on gold_version()
+# makes a new load a cache miss instead of relying on a TTL, which
+# Streamlit ignores on persisted caches.
+@st.cache_data(persist="disk", show_spinner="Loading…")
+def get_competition_stats(version):
+    """Get competition statistics"""
+    return warm_gold(version)['competition_stats']
+
+
+@st.cache_data(persist="disk", show_spinner="Loading…")
+def get_team_performance(version):
+    """Get team performance statistics"""
+    return warm_gold(version)['team_performance']
+
 
+@st.cache_data(ttl=3600, show_spinner="Loading…")
+def get_recent_matches(version, limit=RECENT_MATCHES_LIMIT):
+    """Get recent matches"""
+    return warm_gold(version)['recent_matches'].head(limit)
 
-def get_matches_by_team(team_name):
+
+@st.cache_data(ttl=3600, show_spinner="Loading…")
+def get_matches_by_team(team_name, limit=20):
     """Get matches for a specific team"""
-    query = f"""
+    query = """
     SELECT 
         match_date,
         competition_name,
@@ -125,24 +179,540 @@ def get_matches_by_team(team_name):
         away_team_name,
         fulltime_home_score,
         fulltime_away_score,
+        CONCAT(fulltime_home_score, ' - ', fulltime_away_score) AS "Score",
         match_outcome,
         CASE 
-            WHEN home_team_name = '{team_name}' AND winner = 'HOME_TEAM' THEN 'Win'
-            WHEN away_team_name = '{team_name}' AND winner = 'AWAY_TEAM' THEN 'Win'
+            WHEN home_team_name = :team AND winner = 'HOME_TEAM' THEN 'Win'
+            WHEN away_team_name = :team AND winner = 'AWAY_TEAM' THEN 'Win'
             WHEN winner = 'DRAW' THEN 'Draw'
             ELSE 'Loss'
         END as result
     FROM gold.fact_matches
-    WHERE home_team_name = '{team_name}' OR away_team_name = '{team_name}'
+    WHERE home_team_name = :team OR away_team_name = :team
     ORDER BY match_date DESC
+    LIMIT :limit
     """
-    return load_data(query)
+    return load_data_with_params(query, {'team': team_name, 'limit': limit})
+
+
+# Optional sidebar filters: NULL matches every row
+COMPETITION_FILTER = """
+    WHERE (:year IS NULL OR match_year = :year)
+      AND (:competition_code IS NULL OR competition_code = :competition_code)
+"""
+
+
+@st.cache_data(ttl=3600, show_spinner="Loading…")
+def get_overview_kpis(year=None, competition_code=None):
+    """Get headline match/goal totals, aggregated in the database"""
+    query = f"""
+    SELECT
+        COALESCE(SUM(total_matches), 0) AS total_matches,
+        COALESCE(SUM(total_goals), 0) AS total_goals,
+        AVG(avg_goals_per_match) AS avg_goals_per_match
+    FROM gold.agg_competition_stats
+    {COMPETITION_FILTER}
+    """
+    params = {'year': year, 'competition_code': competition_code}
+    return load_data_with_params(query, params).iloc[0]
+
+
+@st.cache_data(ttl=3600, show_spinner="Loading…")
+def get_matches_by_competition_rollup(year=None, competition_code=None):
+    """Get match counts per competition, aggregated in the database"""
+    query = f"""
+    SELECT competition_name, SUM(total_matches) AS total_matches
+    FROM gold.agg_competition_stats
+    {COMPETITION_FILTER}
+    GROUP BY competition_name
+    ORDER BY competition_name
+    """
+    params = {'year': year, 'competition_code': competition_code}
+    return load_data_with_params(query, params)
+
+
+@st.cache_data(ttl=3600, show_spinner="Loading…")
+def get_home_away_rollup(year=None, competition_code=None):
+    """Get mean home/away/draw percentages per competition, aggregated in the database"""
+    query = f"""
+    SELECT
+        competition_name,
+        AVG(home_win_percentage) AS home_win_percentage,
+        AVG(away_win_percentage) AS away_win_percentage,
+        AVG(draw_percentage) AS draw_percentage
+    FROM gold.agg_competition_stats
+    {COMPETITION_FILTER}
+    GROUP BY competition_name
+    ORDER BY competition_name
+    """
+    params = {'year': year, 'competition_code': competition_code}
+    return load_data_with_params(query, params)
+
+
+# Read-only lookups over the persisted gold frames, built once per gold load
+@st.cache_resource(max_entries=2)
+def competition_slices(version):
+    """Competition stats split by competition_name"""
+    return dict(tuple(get_competition_stats(version).groupby('competition_name')))
+
+
+@st.cache_resource(max_entries=2)
+def team_slices(version):
+    """Team performance split by competition_code"""
+    return dict(tuple(get_team_performance(version).groupby('competition_code')))
+
+
+@st.cache_resource(max_entries=2)
+def team_lookup(version):
+    """Team performance indexed by (competition_code, team_name)"""
+    team_perf = get_team_performance(version).set_index(['competition_code', 'team_name'])
+    return team_perf[~team_perf.index.duplicated()]
+
+
+def _top_k(teams, column, k=5, largest=True):
+    """k best rows on column via argpartition (no full sort), best first"""
+    values = teams[column].to_numpy()
+    keys = -values if largest else values
+    if len(values) > k:
+        picked = np.argpartition(keys, k - 1)[:k]
+    else:
+        picked = np.arange(len(values))
+    picked = picked[np.argsort(keys[picked], kind='stable')]
+    return teams.iloc[picked][['team_name', column]]
+
+
+@st.cache_data(ttl=3600, show_spinner="Loading…")
+def team_leaders(version, competition_code):
+    """Most points, most goals and best defense tables for one competition"""
+    teams = team_slices(version)[competition_code]
+    return (
+        _top_k(teams, 'total_points'),
+        _top_k(teams, 'total_goals_scored'),
+        _top_k(teams, 'total_goals_conceded', largest=False),
+    )
+
+
+# ============================================================================
+# PAGE: OVERVIEW
+# ============================================================================
+
+@st.fragment
+def overview_page(selected_year, selected_competition_filter):
+    """Overview page: headline KPIs, recent matches and competition split"""
+    st.header("📊 Overall Statistics")
+    
+    # Sidebar filters, pushed down into the aggregate queries
+    year = None if selected_year == "All Years" else selected_year
+    comp_code = None
+    if selected_competition_filter != "All Competitions":
+        comp_code = selected_competition_filter.split(" - ")[0]
+    
+    # Load data
+    kpis = get_overview_kpis(year, comp_code)
+    comp_dist = get_matches_by_competition_rollup(year, comp_code)
+    version = gold_version()
+    team_perf = get_team_performance(version)
+    recent = get_recent_matches(version, 10)
+    
+    if comp_code is not None:
+        team_perf = team_perf[team_perf['competition_code'] == comp_code]
+    
+    # Key Metrics
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        total_matches = int(kpis['total_matches'])
+        st.metric("Total Matches", f"{total_matches:,}")
+    
+    with col2:
+        total_goals = int(kpis['total_goals'])
+        st.metric("Total Goals", f"{total_goals:,}")
+    
+    with col3:
+        avg_goals = float(kpis['avg_goals_per_match'] or 0)
+        st.metric("Avg Goals/Match", f"{avg_goals:.2f}")
+    
+    with col4:
+        total_teams = len(team_perf)
+        st.metric("Total Teams", total_teams)
+    
+    st.markdown("---")
+    
+    # Recent Matches
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        st.subheader("🔥 Recent Matches")
+        
+        # "Match" label is built in the recent_matches query
+        st.dataframe(
+            recent[['match_date', 'competition_name', 'Match', 'match_outcome']],
+            use_container_width=True,
+            hide_index=True
+        )
+    
+    with col2:
+        st.subheader("📈 Competition Distribution")
+        fig = px.pie(
+            values=comp_dist['total_matches'],
+            names=comp_dist['competition_name'],
+            title="Matches by Competition"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+
+# ============================================================================
+# PAGE: COMPETITION ANALYSIS
+# ============================================================================
+
+@st.fragment
+def competition_analysis_page(selected_year):
+    """Competition Analysis page: per-competition trends"""
+    st.header("🏆 Competition Analysis")
+    
+    # Options come from the slices they index, so both see the same load
+    slices = competition_slices(gold_version())
+    
+    # Apply year filter from sidebar
+    comp_names = [
+        name for name, comp_data in slices.items()
+        if selected_year == "All Years" or (comp_data['match_year'] == selected_year).any()
+    ]
+    
+    # Filter by competition
+    selected_comp = st.selectbox(
+        "Select Competition",
+        comp_names
+    )
+    
+    comp_data = slices[selected_comp]
+    if selected_year != "All Years":
+        comp_data = comp_data[comp_data['match_year'] == selected_year]
+    
+    # Metrics
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Total Matches", comp_data['total_matches'].sum())
+    
+    with col2:
+        st.metric("Total Goals", comp_data['total_goals'].sum())
+    
+    with col3:
+        st.metric("Avg Goals/Match", f"{comp_data['avg_goals_per_match'].mean():.2f}")
+    
+    st.markdown("---")
+    
+    # Charts
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("🎯 Home Advantage Analysis")
+        
+        fig = go.Figure(data=[
+            go.Bar(name='Home Wins', x=comp_data['match_year'], y=comp_data['home_win_percentage']),
+            go.Bar(name='Away Wins', x=comp_data['match_year'], y=comp_data['away_win_percentage']),
+            go.Bar(name='Draws', x=comp_data['match_year'], y=comp_data['draw_percentage'])
+        ])
+        
+        fig.update_layout(barmode='group', yaxis_title='Percentage (%)')
+        st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        st.subheader("⚽ Goals Trend")
+        
+        # WebGL trace: stays responsive as seasons accumulate
+        trend = comp_data.sort_values('match_year')
+        fig = go.Figure(go.Scattergl(
+            x=trend['match_year'],
+            y=trend['avg_goals_per_match'],
+            mode='lines+markers'
+        ))
+        fig.update_layout(
+            title='Average Goals per Match by Year',
+            xaxis_title='match_year',
+            yaxis_title='avg_goals_per_match'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Detailed stats table
+    st.subheader("📊 Detailed Statistics")
+    st.dataframe(comp_data, use_container_width=True, hide_index=True)
+
+
+# ============================================================================
+# PAGE: TEAM PERFORMANCE
+# ============================================================================
+
+@st.fragment
+def team_performance_page(selected_competition_filter):
+    """Team Performance page: league standings and top performers"""
+    st.header("👥 Team Performance Rankings")
+    
+    # Options come from the slices they index, so both see the same load
+    version = gold_version()
+    slices = team_slices(version)
+    comp_codes = list(slices)
+    
+    # Apply competition filter from sidebar if set
+    if selected_competition_filter != "All Competitions":
+        comp_code = selected_competition_filter.split(" - ")[0]
+        comp_codes = [code for code in comp_codes if code == comp_code]
+    
+    # Filter by competition (page level)
+    selected_comp = st.selectbox(
+        "Select Competition",
+        comp_codes
+    )
+    
+    filtered_teams = slices[selected_comp]
+    top_points, top_goals, best_defense = team_leaders(version, selected_comp)
+    
+    # Top performers
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.subheader("🥇 Most Points")
+        st.dataframe(top_points, use_container_width=True, hide_index=True)
+    
+    with col2:
+        st.subheader("⚽ Most Goals")
+        st.dataframe(top_goals, use_container_width=True, hide_index=True)
+    
+    with col3:
+        st.subheader("🛡️ Best Defense")
+        st.dataframe(best_defense, use_container_width=True, hide_index=True)
+    
+    st.markdown("---")
+    
+    # Standings visualization
+    st.subheader("📊 League Standings")
+    
+    fig = px.bar(
+        filtered_teams.head(20),
+        x='total_points',
+        y='team_name',
+        orientation='h',
+        color='goal_difference',
+        title='Team Rankings by Points',
+        labels={'total_points': 'Points', 'team_name': 'Team', 'goal_difference': 'Goal Diff'}
+    )
+    fig.update_layout(height=600)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Full table
+    st.subheader("📋 Complete Standings")
+    
+    display_cols = [
+        'team_name', 'total_matches', 'total_wins', 'total_draws', 'total_losses',
+        'total_goals_scored', 'total_goals_conceded', 'goal_difference', 'total_points',
+        'win_percentage', 'points_per_match'
+    ]
+    
+    st.dataframe(
+        filtered_teams[display_cols],
+        use_container_width=True,
+        hide_index=True
+    )
+
+
+# ============================================================================
+# PAGE: MATCH ANALYSIS
+# ============================================================================
+
+@st.fragment
+def match_analysis_page(selected_year, selected_competition_filter):
+    """Match Analysis page: scoring and home/away outcomes"""
+    st.header("📈 Match Statistics Analysis")
+    
+    comp_stats = get_competition_stats(gold_version())
+    
+    # Apply year filter from sidebar
+    if selected_year != "All Years":
+        comp_stats = comp_stats[comp_stats['match_year'] == selected_year]
+    
+    # Apply competition filter from sidebar
+    if selected_competition_filter != "All Competitions":
+        comp_code = selected_competition_filter.split(" - ")[0]
+        comp_stats = comp_stats[comp_stats['competition_code'] == comp_code]
+    
+    # High scoring matches analysis
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("🎯 High Scoring Matches")
+        
+        fig = px.bar(
+            comp_stats,
+            x='competition_name',
+            y='high_scoring_percentage',
+            color='match_year',
+            barmode='group',
+            title='High Scoring Matches (>3 goals) by Competition',
+            labels={'high_scoring_percentage': 'Percentage (%)', 'competition_name': 'Competition'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        st.subheader("📊 Goals Distribution")
+        
+        fig = px.box(
+            comp_stats,
+            x='competition_name',
+            y='avg_goals_per_match',
+            color='competition_name',
+            title='Goals per Match Distribution'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Home vs Away analysis
+    st.subheader("🏠 Home vs Away Performance")
+    
+    year = None if selected_year == "All Years" else selected_year
+    comp_code = None
+    if selected_competition_filter != "All Competitions":
+        comp_code = selected_competition_filter.split(" - ")[0]
+    home_away_data = get_home_away_rollup(year, comp_code)
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=home_away_data['competition_name'], y=home_away_data['home_win_percentage'], name='Home Wins'))
+    fig.add_trace(go.Bar(x=home_away_data['competition_name'], y=home_away_data['away_win_percentage'], name='Away Wins'))
+    fig.add_trace(go.Bar(x=home_away_data['competition_name'], y=home_away_data['draw_percentage'], name='Draws'))
+    
+    fig.update_layout(barmode='stack', yaxis_title='Percentage (%)', title='Match Outcomes by Competition')
+    st.plotly_chart(fig, use_container_width=True)
+
+
+# ============================================================================
+# PAGE: TEAM DEEP DIVE
+# ============================================================================
+
+@st.fragment
+def team_deep_dive_page(selected_competition_filter):
+    """Team Deep Dive page: one team's record and recent form"""
+    st.header("🔍 Team Deep Dive Analysis")
+    
+    lookup = team_lookup(gold_version())
+    keys = lookup.index
+    
+    # Apply competition filter from sidebar
+    if selected_competition_filter != "All Competitions":
+        comp_code = selected_competition_filter.split(" - ")[0]
+        keys = keys[keys.get_level_values('competition_code') == comp_code]
+    
+    # Team name -> its lookup key, first competition listed when unfiltered
+    team_keys = {}
+    for key in keys:
+        team_keys.setdefault(key[1], key)
+    
+    # Team selector
+    selected_team = st.selectbox(
+        "Select Team",
+        sorted(team_keys)
+    )
+    
+    # Get team data
+    team_data = lookup.loc[team_keys[selected_team]]
+    team_matches = get_matches_by_team(selected_team)
+    
+    # Team overview metrics
+    st.subheader(f"📊 {selected_team} - Season Overview")
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    with col1:
+        st.metric("Matches Played", int(team_data['total_matches']))
+    
+    with col2:
+        st.metric("Total Points", int(team_data['total_points']))
+    
+    with col3:
+        st.metric("Win Rate", f"{team_data['win_percentage']:.1f}%")
+    
+    with col4:
+        st.metric("Goals Scored", int(team_data['total_goals_scored']))
+    
+    with col5:
+        st.metric("Goal Difference", int(team_data['goal_difference']))
+    
+    st.markdown("---")
+    
+    # Performance breakdown
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("🏆 Win/Draw/Loss")
+        
+        wdl_data = pd.DataFrame({
+            'Result': ['Wins', 'Draws', 'Losses'],
+            'Count': [team_data['total_wins'], team_data['total_draws'], team_data['total_losses']]
+        })
+        
+        fig = px.pie(wdl_data, values='Count', names='Result', 
+                    color_discrete_sequence=['#2ecc71', '#f39c12', '#e74c3c'])
+        st.plotly_chart(fig, use_container_width=True)
+    
+    with col2:
+        st.subheader("🏠 Home vs Away")
+        
+        home_away = pd.DataFrame({
+            'Venue': ['Home', 'Away'],
+            'Wins': [team_data['home_wins'], team_data['away_wins']],
+            'Matches': [team_data['home_matches'], team_data['away_matches']]
+        })
+        
+        fig = go.Figure(data=[
+            go.Bar(name='Wins', x=home_away['Venue'], y=home_away['Wins']),
+            go.Bar(name='Matches', x=home_away['Venue'], y=home_away['Matches'])
+        ])
+        fig.update_layout(barmode='group')
+        st.plotly_chart(fig, use_container_width=True)
+    
+    # Recent form
+    st.subheader("📅 Recent Matches")
+    
+    if not team_matches.empty:
+        # "Score" label is built in the get_matches_by_team query
+        st.dataframe(
+            team_matches[['match_date', 'competition_name', 'home_team_name', 'away_team_name', 'Score', 'result']].head(20),
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        # Form chart
+        recent_form = team_matches.head(10)['result'].value_counts()
+        
+        fig = px.bar(
+            x=recent_form.index,
+            y=recent_form.values,
+            title='Last 10 Matches Form',
+            labels={'x': 'Result', 'y': 'Count'},
+            color=recent_form.index,
+            color_discrete_map={'Win': '#2ecc71', 'Draw': '#f39c12', 'Loss': '#e74c3c'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No match data available for this team")
 
 
 # ============================================================================
 # DASHBOARD LAYOUT
 # ============================================================================
 
+SIDEBAR_ICON_URL = "https://img.icons8.com/color/96/000000/football2--v1.png"
+
+
+@st.cache_resource
+def sidebar_icon():
+    """Download the sidebar icon once per server process, served as bytes afterwards"""
+    try:
+        with urllib.request.urlopen(SIDEBAR_ICON_URL, timeout=10) as response:
+            return response.read()
+    except OSError:
+        # Let the browser fetch it if the server cannot
+        return SIDEBAR_ICON_URL
+
+
 def main():
     
     # Header
@@ -151,7 +721,7 @@ def main():
     
     # Sidebar
     with st.sidebar:
-        st.image("https://img.icons8.com/color/96/000000/football2--v1.png", width=100)
+        st.image(sidebar_icon(), width=100)
         st.title("Navigation")
         
         page = st.radio(
@@ -183,396 +753,27 @@ def main():
         st.markdown("### 📅 Data Refresh")
         if st.button("🔄 Refresh Data"):
             st.cache_data.clear()
+            warm_gold.clear()
+            competition_slices.clear()
+            team_slices.clear()
+            team_lookup.clear()
             st.success("Data refreshed!")
         
         st.markdown("---")
         st.markdown("### ℹ️ About")
         st.info("This dashboard displays football statistics from Premier League, La Liga, and Ligue 1.")
     
-    # ========================================================================
-    # PAGE: OVERVIEW
-    # ========================================================================
-    
+    # Each page is a fragment: its own widgets only rerun that page
     if page == "📊 Overview":
-        st.header("📊 Overall Statistics")
-        
-        # Load data
-        comp_stats = get_competition_stats()
-        team_perf = get_team_performance()
-        recent = get_recent_matches(10)
-        
-        # Apply year filter
-        if selected_year != "All Years":
-            comp_stats = comp_stats[comp_stats['match_year'] == selected_year]
-        
-        # Apply competition filter
-        if selected_competition_filter != "All Competitions":
-            comp_code = selected_competition_filter.split(" - ")[0]
-            comp_stats = comp_stats[comp_stats['competition_code'] == comp_code]
-            team_perf = team_perf[team_perf['competition_code'] == comp_code]
-        
-        # Key Metrics
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            total_matches = comp_stats['total_matches'].sum()
-            st.metric("Total Matches", f"{total_matches:,}")
-        
-        with col2:
-            total_goals = comp_stats['total_goals'].sum()
-            st.metric("Total Goals", f"{total_goals:,}")
-        
-        with col3:
-            avg_goals = comp_stats['avg_goals_per_match'].mean()
-            st.metric("Avg Goals/Match", f"{avg_goals:.2f}")
-        
-        with col4:
-            total_teams = len(team_perf)
-            st.metric("Total Teams", total_teams)
-        
-        st.markdown("---")
-        
-        # Recent Matches
-        col1, col2 = st.columns([2, 1])
-        
-        with col1:
-            st.subheader("🔥 Recent Matches")
-            
-            # Format recent matches for display
-            recent_display = recent.copy()
-            recent_display['Match'] = (
-                recent_display['home_team_name'] + ' ' +
-                recent_display['fulltime_home_score'].astype(str) + ' - ' +
-                recent_display['fulltime_away_score'].astype(str) + ' ' +
-                recent_display['away_team_name']
-            )
-            
-            st.dataframe(
-                recent_display[['match_date', 'competition_name', 'Match', 'match_outcome']],
-                use_container_width=True,
-                hide_index=True
-            )
-        
-        with col2:
-            st.subheader("📈 Competition Distribution")
-            comp_dist = comp_stats.groupby('competition_name')['total_matches'].sum()
-            
-            fig = px.pie(
-                values=comp_dist.values,
-                names=comp_dist.index,
-                title="Matches by Competition"
-            )
-            st.plotly_chart(fig, use_container_width=True)
-    
-    # ========================================================================
-    # PAGE: COMPETITION ANALYSIS
-    # ========================================================================
-    
+        overview_page(selected_year, selected_competition_filter)
     elif page == "🏆 Competition Analysis":
-        st.header("🏆 Competition Analysis")
-        
-        comp_stats = get_competition_stats()
-        
-        # Apply year filter from sidebar
-        if selected_year != "All Years":
-            comp_stats = comp_stats[comp_stats['match_year'] == selected_year]
-        
-        # Filter by competition
-        selected_comp = st.selectbox(
-            "Select Competition",
-            comp_stats['competition_name'].unique()
-        )
-        
-        comp_data = comp_stats[comp_stats['competition_name'] == selected_comp]
-        
-        # Metrics
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.metric("Total Matches", comp_data['total_matches'].sum())
-        
-        with col2:
-            st.metric("Total Goals", comp_data['total_goals'].sum())
-        
-        with col3:
-            st.metric("Avg Goals/Match", f"{comp_data['avg_goals_per_match'].mean():.2f}")
-        
-        st.markdown("---")
-        
-        # Charts
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.subheader("🎯 Home Advantage Analysis")
-            
-            fig = go.Figure(data=[
-                go.Bar(name='Home Wins', x=comp_data['match_year'], y=comp_data['home_win_percentage']),
-                go.Bar(name='Away Wins', x=comp_data['match_year'], y=comp_data['away_win_percentage']),
-                go.Bar(name='Draws', x=comp_data['match_year'], y=comp_data['draw_percentage'])
-            ])
-            
-            fig.update_layout(barmode='group', yaxis_title='Percentage (%)')
-            st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            st.subheader("⚽ Goals Trend")
-            
-            fig = px.line(
-                comp_data,
-                x='match_year',
-                y='avg_goals_per_match',
-                markers=True,
-                title='Average Goals per Match by Year'
-            )
-            st.plotly_chart(fig, use_container_width=True)
-        
-        # Detailed stats table
-        st.subheader("📊 Detailed Statistics")
-        st.dataframe(comp_data, use_container_width=True, hide_index=True)
-    
-    # ========================================================================
-    # PAGE: TEAM PERFORMANCE
-    # ========================================================================
-    
+        competition_analysis_page(selected_year)
     elif page == "👥 Team Performance":
-        st.header("👥 Team Performance Rankings")
-        
-        team_perf = get_team_performance()
-        
-        # Apply competition filter from sidebar if set
-        if selected_competition_filter != "All Competitions":
-            comp_code = selected_competition_filter.split(" - ")[0]
-            team_perf = team_perf[team_perf['competition_code'] == comp_code]
-        
-        # Filter by competition (page level)
-        selected_comp = st.selectbox(
-            "Select Competition",
-            team_perf['competition_code'].unique()
-        )
-        
-        filtered_teams = team_perf[team_perf['competition_code'] == selected_comp].copy()
-        
-        # Top performers
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.subheader("🥇 Most Points")
-            top_points = filtered_teams.nlargest(5, 'total_points')[['team_name', 'total_points']]
-            st.dataframe(top_points, use_container_width=True, hide_index=True)
-        
-        with col2:
-            st.subheader("⚽ Most Goals")
-            top_goals = filtered_teams.nlargest(5, 'total_goals_scored')[['team_name', 'total_goals_scored']]
-            st.dataframe(top_goals, use_container_width=True, hide_index=True)
-        
-        with col3:
-            st.subheader("🛡️ Best Defense")
-            best_defense = filtered_teams.nsmallest(5, 'total_goals_conceded')[['team_name', 'total_goals_conceded']]
-            st.dataframe(best_defense, use_container_width=True, hide_index=True)
-        
-        st.markdown("---")
-        
-        # Standings visualization
-        st.subheader("📊 League Standings")
-        
-        fig = px.bar(
-            filtered_teams.head(20),
-            x='total_points',
-            y='team_name',
-            orientation='h',
-            color='goal_difference',
-            title='Team Rankings by Points',
-            labels={'total_points': 'Points', 'team_name': 'Team', 'goal_difference': 'Goal Diff'}
-        )
-        fig.update_layout(height=600)
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Full table
-        st.subheader("📋 Complete Standings")
-        
-        display_cols = [
-            'team_name', 'total_matches', 'total_wins', 'total_draws', 'total_losses',
-            'total_goals_scored', 'total_goals_conceded', 'goal_difference', 'total_points',
-            'win_percentage', 'points_per_match'
-        ]
-        
-        st.dataframe(
-            filtered_teams[display_cols],
-            use_container_width=True,
-            hide_index=True
-        )
-    
-    # ========================================================================
-    # PAGE: MATCH ANALYSIS
-    # ========================================================================
-    
+        team_performance_page(selected_competition_filter)
     elif page == "📈 Match Analysis":
-        st.header("📈 Match Statistics Analysis")
-        
-        comp_stats = get_competition_stats()
-        
-        # Apply year filter from sidebar
-        if selected_year != "All Years":
-            comp_stats = comp_stats[comp_stats['match_year'] == selected_year]
-        
-        # Apply competition filter from sidebar
-        if selected_competition_filter != "All Competitions":
-            comp_code = selected_competition_filter.split(" - ")[0]
-            comp_stats = comp_stats[comp_stats['competition_code'] == comp_code]
-        
-        # High scoring matches analysis
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.subheader("🎯 High Scoring Matches")
-            
-            fig = px.bar(
-                comp_stats,
-                x='competition_name',
-                y='high_scoring_percentage',
-                color='match_year',
-                barmode='group',
-                title='High Scoring Matches (>3 goals) by Competition',
-                labels={'high_scoring_percentage': 'Percentage (%)', 'competition_name': 'Competition'}
-            )
-            st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            st.subheader("📊 Goals Distribution")
-            
-            fig = px.box(
-                comp_stats,
-                x='competition_name',
-                y='avg_goals_per_match',
-                color='competition_name',
-                title='Goals per Match Distribution'
-            )
-            st.plotly_chart(fig, use_container_width=True)
-        
-        # Home vs Away analysis
-        st.subheader("🏠 Home vs Away Performance")
-        
-        home_away_data = comp_stats.groupby('competition_name').agg({
-            'home_win_percentage': 'mean',
-            'away_win_percentage': 'mean',
-            'draw_percentage': 'mean'
-        }).reset_index()
-        
-        fig = go.Figure()
-        fig.add_trace(go.Bar(x=home_away_data['competition_name'], y=home_away_data['home_win_percentage'], name='Home Wins'))
-        fig.add_trace(go.Bar(x=home_away_data['competition_name'], y=home_away_data['away_win_percentage'], name='Away Wins'))
-        fig.add_trace(go.Bar(x=home_away_data['competition_name'], y=home_away_data['draw_percentage'], name='Draws'))
-        
-        fig.update_layout(barmode='stack', yaxis_title='Percentage (%)', title='Match Outcomes by Competition')
-        st.plotly_chart(fig, use_container_width=True)
-    
-    # ========================================================================
-    # PAGE: TEAM DEEP DIVE
-    # ========================================================================
-    
+        match_analysis_page(selected_year, selected_competition_filter)
     elif page == "🔍 Team Deep Dive":
-        st.header("🔍 Team Deep Dive Analysis")
-        
-        team_perf = get_team_performance()
-        
-        # Apply competition filter from sidebar
-        if selected_competition_filter != "All Competitions":
-            comp_code = selected_competition_filter.split(" - ")[0]
-            team_perf = team_perf[team_perf['competition_code'] == comp_code]
-        
-        # Team selector
-        selected_team = st.selectbox(
-            "Select Team",
-            sorted(team_perf['team_name'].unique())
-        )
-        
-        # Get team data
-        team_data = team_perf[team_perf['team_name'] == selected_team].iloc[0]
-        team_matches = get_matches_by_team(selected_team)
-        
-        # Team overview metrics
-        st.subheader(f"📊 {selected_team} - Season Overview")
-        
-        col1, col2, col3, col4, col5 = st.columns(5)
-        
-        with col1:
-            st.metric("Matches Played", int(team_data['total_matches']))
-        
-        with col2:
-            st.metric("Total Points", int(team_data['total_points']))
-        
-        with col3:
-            st.metric("Win Rate", f"{team_data['win_percentage']:.1f}%")
-        
-        with col4:
-            st.metric("Goals Scored", int(team_data['total_goals_scored']))
-        
-        with col5:
-            st.metric("Goal Difference", int(team_data['goal_difference']))
-        
-        st.markdown("---")
-        
-        # Performance breakdown
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.subheader("🏆 Win/Draw/Loss")
-            
-            wdl_data = pd.DataFrame({
-                'Result': ['Wins', 'Draws', 'Losses'],
-                'Count': [team_data['total_wins'], team_data['total_draws'], team_data['total_losses']]
-            })
-            
-            fig = px.pie(wdl_data, values='Count', names='Result', 
-                        color_discrete_sequence=['#2ecc71', '#f39c12', '#e74c3c'])
-            st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            st.subheader("🏠 Home vs Away")
-            
-            home_away = pd.DataFrame({
-                'Venue': ['Home', 'Away'],
-                'Wins': [team_data['home_wins'], team_data['away_wins']],
-                'Matches': [team_data['home_matches'], team_data['away_matches']]
-            })
-            
-            fig = go.Figure(data=[
-                go.Bar(name='Wins', x=home_away['Venue'], y=home_away['Wins']),
-                go.Bar(name='Matches', x=home_away['Venue'], y=home_away['Matches'])
-            ])
-            fig.update_layout(barmode='group')
-            st.plotly_chart(fig, use_container_width=True)
-        
-        # Recent form
-        st.subheader("📅 Recent Matches")
-        
-        if not team_matches.empty:
-            team_matches_display = team_matches.copy()
-            team_matches_display['Score'] = (
-                team_matches_display['fulltime_home_score'].astype(str) + ' - ' +
-                team_matches_display['fulltime_away_score'].astype(str)
-            )
-            
-            st.dataframe(
-                team_matches_display[['match_date', 'competition_name', 'home_team_name', 'away_team_name', 'Score', 'result']].head(20),
-                use_container_width=True,
-                hide_index=True
-            )
-            
-            # Form chart
-            recent_form = team_matches.head(10)['result'].value_counts()
-            
-            fig = px.bar(
-                x=recent_form.index,
-                y=recent_form.values,
-                title='Last 10 Matches Form',
-                labels={'x': 'Result', 'y': 'Count'},
-                color=recent_form.index,
-                color_discrete_map={'Win': '#2ecc71', 'Draw': '#f39c12', 'Loss': '#e74c3c'}
-            )
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("No match data available for this team")
+        team_deep_dive_page(selected_competition_filter)
     
     # Footer
     st.markdown("---")
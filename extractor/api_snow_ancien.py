@@ -2,15 +2,22 @@ from dotenv import load_dotenv
 import os 
 import pandas as pd
 import httpx
+import json
+import asyncio
 import snowflake.connector
 from snowflake.connector.pandas_tools import write_pandas
 from pathlib import Path 
 from sqlalchemy import create_engine
 from typing import Optional, Dict, Any 
+# Même stage RAW_PAYLOAD et même cadence de requêtes que api_snowflake.py
+from api_snowflake import MATCHES_SELECT, RequestPacer
 
 load_dotenv()
 API_BASE = "https://api.football-data.org/v4"
 HEADERS = {"X-Auth-Token" : os.environ["FOOTBALL_API_TOKEN"]}
+# Quota football-data.org : 10 requêtes/minute
+MAX_CONCURRENT_REQUESTS = 5
+REQUEST_INTERVAL = 6
 SNOWFLAKE_CONFIG ={
     'user': os.environ["SNOWFLAKE_USER"],
     'password': os.environ["SNOWFLAKE_PASSWORD"],
@@ -20,15 +27,33 @@ SNOWFLAKE_CONFIG ={
     'schema' : 'RAW',
 
 }
+# Connexion partagée : un seul handshake Snowflake par exécution du script
+_CONNECTION = None
+
 def get_snowflake_connection():
-    return snowflake.connector.connect(**SNOWFLAKE_CONFIG)
+    global _CONNECTION
+    if _CONNECTION is None or _CONNECTION.is_closed():
+        _CONNECTION = snowflake.connector.connect(**SNOWFLAKE_CONFIG)
+    return _CONNECTION
+# Client HTTP partagé : une seule pool de connexions (TLS + HTTP/2) par processus
+_CLIENT = None
+
+def get_http_client() -> httpx.Client:
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = httpx.Client(
+            timeout=60,
+            headers=HEADERS,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=10)
+        )
+    return _CLIENT
 
 def fetch_load_competitions():
     url = f"{API_BASE}/competitions"
-    with httpx.Client(timeout=60) as client : 
-            response = client.get(url, headers=HEADERS)
-            response.raise_for_status()
-            data = response.json()
+    response = get_http_client().get(url)
+    response.raise_for_status()
+    data = response.json()
     competitions = data.get('competitions', [])
     df = pd.DataFrame(competitions)
     conn = get_snowflake_connection()
@@ -43,39 +68,81 @@ def fetch_load_competitions():
             auto_create_table = True,
             overwrite = False
         )
-    conn.close()
     print(f"{len(df)} competitions chargé dans snowflake")
     return [comp['id'] for comp in competitions]
 
-def fetch_and_load_matches(seasons=[]):
-    competitions_ids = fetch_load_competitions()
-    all_matches =[]
-    for season in seasons : 
-        for comp_id in competitions_ids:
-            print(f"extraction saison {season}")
-            url = f"{API_BASE}/competitions/{comp_id}/matches?season={season}"
-            with httpx.Client(timeout=60) as client:
-                response = client.get(url, headers = HEADERS)
-                response.raise_for_status()
-                data = response.json()
-            matches = data.get('matches', [])
-            for match in matches:
-                match['season'] = season
-                match['competition_id'] = comp_id
-            all_matches.extend(matches)
-    df = pd.DataFrame(all_matches)
-    with get_snowflake_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("TRUNCATE TABLE IF EXISTS RAW.MATCHES")
-            write_pandas(
-                conn = conn, 
-                df = df,
-                table_name= 'MATCHES',
-                database = 'FOOTBALL_STATS',
-                schema = 'RAW',
-                auto_create_table = True,
-                overwrite = False
+async def fetch_season_matches(client, semaphore, pacer, season, comp_id):
+    """Matchs d'une compétition pour une saison"""
+    async with semaphore:
+        print(f"extraction saison {season}")
+        url = f"{API_BASE}/competitions/{comp_id}/matches?season={season}"
+        await pacer.wait()
+        response = await client.get(url)
+        response.raise_for_status()
+        data = response.json()
+    matches = data.get('matches', [])
+    for match in matches:
+        match['season'] = season
+        match['competition_id'] = comp_id
+    return matches
+
+def load_matches_chunk(conn, matches):
+    """Ajoute les matchs d'une saison x compétition à RAW.MATCHES_STAGE"""
+    # Payload brut : le schéma du stage ne dépend pas du premier lot chargé
+    write_pandas(
+            conn = conn, 
+            df = pd.DataFrame({'RAW_PAYLOAD': [json.dumps(match) for match in matches]}),
+            table_name= 'MATCHES_STAGE',
+            database = 'FOOTBALL_STATS',
+            schema = 'RAW',
+            auto_create_table = False,
+            overwrite = False
         )
+    return len(matches)
+
+async def fetch_and_load_matches(seasons=[]):
+    competitions_ids = fetch_load_competitions()
+    conn = get_snowflake_connection()
+    cursor = conn.cursor()
+    cursor.execute("CREATE OR REPLACE TABLE RAW.MATCHES_STAGE (RAW_PAYLOAD STRING)")
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    pacer = RequestPacer(REQUEST_INTERVAL)
+    errors = []
+    total_matches = 0
+    async with httpx.AsyncClient(
+        timeout=60,
+        headers=HEADERS,
+        http2=True,
+        limits=httpx.Limits(max_connections=10)
+    ) as client:
+        tasks = [
+            fetch_season_matches(client, semaphore, pacer, season, comp_id)
+            for season in seasons for comp_id in competitions_ids
+        ]
+        # Chargement au fil de l'eau : une saison x compétition en mémoire à la fois
+        for next_result in asyncio.as_completed(tasks):
+            try:
+                matches = await next_result
+            except Exception as e:
+                errors.append(e)
+                continue
+            if matches:
+                total_matches += await asyncio.to_thread(load_matches_chunk, conn, matches)
+    # Toutes les requêtes sont terminées : on remonte la première erreur,
+    # RAW.MATCHES reste intact et le stage garde les lots déjà chargés
+    if errors:
+        raise errors[0]
+    if not total_matches:
+        print("⚠️ Aucun match récupéré, RAW.MATCHES inchangée")
+        return
+    cursor.execute(f"CREATE OR REPLACE TABLE RAW.MATCHES AS {MATCHES_SELECT}")
+    print(f"✅ {total_matches} matchs chargés dans Snowflake RAW.MATCHES")
 if __name__== "__main__":
-    fetch_load_competitions()
-    fetch_and_load_matches(seasons=[2021, 2022, 2023, 2024])
+    try:
+        fetch_load_competitions()
+        asyncio.run(fetch_and_load_matches(seasons=[2021, 2022, 2023, 2024]))
+    finally:
+        if _CONNECTION is not None:
+            _CONNECTION.close()
+        if _CLIENT is not None:
+            _CLIENT.close()
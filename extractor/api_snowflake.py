@@ -6,88 +6,200 @@ import json
 import snowflake.connector
 from snowflake.connector.pandas_tools import write_pandas
 from pathlib import Path 
-from snowflake.sqlalchemy import URL
-from sqlalchemy import create_engine
 from typing import Optional, Dict, Any 
-import time
+import asyncio
 
 load_dotenv()
 API_BASE = "https://api.football-data.org/v4"
 HEADERS = {"X-Auth-Token" : os.environ["FOOTBALL_API_TOKEN"]}
-def get_snowflake_engine():
-    """Crée un moteur SQLAlchemy pour Snowflake"""
-    return create_engine(URL(
-        user=os.environ["SNOWFLAKE_USER"],
-        password=os.environ["SNOWFLAKE_PASSWORD"],
-        account=os.environ["SNOWFLAKE_ACCOUNT"],
-        warehouse=os.environ["SNOWFLAKE_WAREHOUSE"],
+# Quota football-data.org : 10 requêtes/minute
+MAX_CONCURRENT_REQUESTS = 5
+REQUEST_INTERVAL = 6
+SNOWFLAKE_CONFIG = {
+    'user': os.environ["SNOWFLAKE_USER"],
+    'password': os.environ["SNOWFLAKE_PASSWORD"],
+    'account': os.environ["SNOWFLAKE_ACCOUNT"],
+    'warehouse': os.environ["SNOWFLAKE_WAREHOUSE"],
+    'database': 'FOOTBALL_STATS',
+    'schema': 'RAW',
+}
+# Connexion partagée : un seul handshake Snowflake par exécution du script
+_CONNECTION = None
+
+def get_snowflake_connection():
+    """Retourne la connexion Snowflake, ouverte au premier appel"""
+    global _CONNECTION
+    if _CONNECTION is None or _CONNECTION.is_closed():
+        _CONNECTION = snowflake.connector.connect(**SNOWFLAKE_CONFIG)
+    return _CONNECTION
+
+
+def load_to_snowflake(df: pd.DataFrame, table_name: str, overwrite: bool = True, auto_create_table: bool = True):
+    """Charge RAW.<table_name> : write_pandas dépose du Parquet en stage puis fait un COPY INTO"""
+    write_pandas(
+        conn=get_snowflake_connection(),
+        df=df,
+        table_name=table_name,
         database='FOOTBALL_STATS',
-        schema='RAW'
-    ))
+        schema='RAW',
+        auto_create_table=auto_create_table,
+        overwrite=overwrite,
+        use_logical_type=True
+    )
+
 
+def serialize_json_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Sérialise en JSON les colonnes objet dont la première valeur non nulle est un dict/list"""
+    for col in df.select_dtypes(include='object').columns:
+        non_null = df[col].dropna()
+        if not non_null.empty and isinstance(non_null.iloc[0], (dict, list)):
+            # map ignore les NaN : seules les valeurs présentes passent par json.dumps
+            df[col] = df[col].map(json.dumps, na_action='ignore')
+    return df
+
+# Client HTTP partagé : une seule pool de connexions (TLS + HTTP/2) par processus
+_CLIENT = None
+
+def get_http_client() -> httpx.Client:
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = httpx.Client(
+            timeout=60,
+            headers=HEADERS,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=10)
+        )
+    return _CLIENT
 
 def fetch_load_competitions():
     url = f"{API_BASE}/competitions"
-    with httpx.Client(timeout=60) as client : 
-            response = client.get(url, headers=HEADERS)
-            response.raise_for_status()
-            data = response.json()
+    response = get_http_client().get(url)
+    response.raise_for_status()
+    data = response.json()
     competitions = data.get('competitions', [])
     df = pd.DataFrame(competitions)
-    for col in df.columns:
-        if df[col].apply(lambda x: isinstance(x, (dict,list))).any():
-            df[col] = df[col].apply(lambda x: json.dumps(x) if isinstance(x, (dict,list))else x)
-    engine = get_snowflake_engine()
-    df.to_sql(
-        'competitions',
-        engine,
-        if_exists='replace',  # Remplace la table (TRUNCATE + INSERT)
-        index=False,
-        method='multi',
-        chunksize=1000
-    )
+    df = serialize_json_columns(df)
+    load_to_snowflake(df, 'COMPETITIONS')
     print(f"{len(df)} competitions chargé dans snowflake")
     return [comp['id'] for comp in competitions]
 
-def fetch_and_load_matches(seasons=[]):
+# Aplatissement des payloads JSON sur l'entrepôt (le stage contient une colonne RAW_PAYLOAD texte)
+MATCHES_SELECT = """
+SELECT
+    p:"id"::NUMBER AS id,
+    p:"utcDate"::TIMESTAMP_TZ AS utc_date,
+    p:"status"::STRING AS status,
+    p:"matchday"::NUMBER AS matchday,
+    p:"stage"::STRING AS stage,
+    p:"group"::STRING AS match_group,
+    p:"lastUpdated"::TIMESTAMP_TZ AS last_updated,
+    p:"season"::NUMBER AS season,
+    p:"competition_id"::NUMBER AS competition_id,
+    p:"competition"."code"::STRING AS competition_code,
+    p:"competition"."name"::STRING AS competition_name,
+    p:"homeTeam"."id"::NUMBER AS home_team_id,
+    p:"homeTeam"."name"::STRING AS home_team_name,
+    p:"awayTeam"."id"::NUMBER AS away_team_id,
+    p:"awayTeam"."name"::STRING AS away_team_name,
+    p:"score"."winner"::STRING AS winner,
+    p:"score"."duration"::STRING AS duration,
+    p:"score"."fullTime"."home"::NUMBER AS fulltime_home_score,
+    p:"score"."fullTime"."away"::NUMBER AS fulltime_away_score,
+    p:"score"."halfTime"."home"::NUMBER AS halftime_home_score,
+    p:"score"."halfTime"."away"::NUMBER AS halftime_away_score,
+    p AS raw_payload
+FROM (SELECT PARSE_JSON(RAW_PAYLOAD) AS p FROM RAW.MATCHES_STAGE)
+"""
+
+class RequestPacer:
+    """Espace les débuts de requêtes d'au moins `interval` secondes, toutes tâches confondues"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def wait(self):
+        """Attend le créneau de la requête ; la requête elle-même n'est pas bloquée"""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next_start - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_start = loop.time() + self.interval
+
+async def fetch_season_matches(client, semaphore, pacer, season, comp_id):
+    """Matchs d'une compétition pour une saison ([] si inaccessible, les autres erreurs remontent)"""
+    async with semaphore:
+        print(f"extraction saison {season}")
+        url = f"{API_BASE}/competitions/{comp_id}/matches?season={season}"
+        try:
+            await pacer.wait()
+            response = await client.get(url)
+            response.raise_for_status()
+            data = response.json()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 403:
+                print(f"  ⚠️ Accès refusé (plan gratuit) - compétition {comp_id}, saison {season}")
+            elif e.response.status_code == 404:
+                print(f"  ⚠️ Pas de données - compétition {comp_id}, saison {season}")
+            else:
+                print(f"  ❌ Erreur HTTP {e.response.status_code}")
+                raise
+            return []  # ✅ Passer à la compétition suivante
+    matches = data.get('matches', [])
+    for match in matches:
+        match['season'] = season
+        match['competition_id'] = comp_id
+    return matches
+
+async def fetch_and_load_matches(seasons=[]):
     competitions_ids = fetch_load_competitions()
-    all_matches =[]
-    for season in seasons : 
-        for comp_id in competitions_ids:
-            print(f"extraction saison {season}")
-            url = f"{API_BASE}/competitions/{comp_id}/matches?season={season}"
-            try:    
-                with httpx.Client(timeout=60) as client:
-                    response = client.get(url, headers = HEADERS)
-                    response.raise_for_status()
-                    data = response.json()
-                matches = data.get('matches', [])
-                for match in matches:
-                    match['season'] = season
-                    match['competition_id'] = comp_id
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 403:
-                    print(f"  ⚠️ Accès refusé (plan gratuit) - compétition {comp_id}, saison {season}")
-                elif e.response.status_code == 404:
-                    print(f"  ⚠️ Pas de données - compétition {comp_id}, saison {season}")
-                else:
-                    print(f"  ❌ Erreur HTTP {e.response.status_code}")
-                continue  # ✅ Passer à la compétition suivante
-            all_matches.extend(matches)
-            time.sleep(6)
-    df = pd.DataFrame(all_matches)
-    for col in df.columns:
-        if df[col].apply(lambda x: isinstance(x, (dict,list))).any():
-            df[col] = df[col].apply(lambda x: json.dumps(x) if isinstance(x,(dict,list)) else x)
-    engine = get_snowflake_engine()
-    df.to_sql(
-        'matches',
-        engine,
-        if_exists='replace',
-        index=False,
-        method='multi',
-        chunksize=1000
-    )
-    print(f"✅ {len(df)} matchs chargés dans Snowflake RAW.MATCHES")
+    cursor = get_snowflake_connection().cursor()
+    # Schéma du stage fixé d'avance : il ne dépend pas du premier lot chargé
+    cursor.execute("CREATE OR REPLACE TABLE RAW.MATCHES_STAGE (RAW_PAYLOAD STRING)")
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    pacer = RequestPacer(REQUEST_INTERVAL)
+    total_matches = 0
+    errors = []
+    # Un seul client : les connexions TLS sont réutilisées entre les requêtes
+    async with httpx.AsyncClient(
+        timeout=60,
+        headers=HEADERS,
+        http2=True,
+        limits=httpx.Limits(max_connections=10)
+    ) as client:
+        tasks = [
+            fetch_season_matches(client, semaphore, pacer, season, comp_id)
+            for season in seasons for comp_id in competitions_ids
+        ]
+        # Chargement au fil de l'eau : une saison x compétition en mémoire à la fois
+        for next_result in asyncio.as_completed(tasks):
+            try:
+                matches = await next_result
+                if not matches:
+                    continue
+                # Payload brut, aplati côté Snowflake dans MATCHES_SELECT
+                df = pd.DataFrame({'RAW_PAYLOAD': [json.dumps(match) for match in matches]})
+                await asyncio.to_thread(load_to_snowflake, df, 'MATCHES_STAGE', False, False)
+                total_matches += len(df)
+            except Exception as e:
+                print(f"  ❌ Erreur: {e}")
+                errors.append(e)
+    # Toutes les requêtes sont terminées : un stage partiel ne remplace pas
+    # RAW.MATCHES, on remonte la première erreur
+    if errors:
+        raise errors[0]
+    if total_matches:
+        cursor.execute(f"CREATE OR REPLACE TABLE RAW.MATCHES AS {MATCHES_SELECT}")
+        print(f"✅ {total_matches} matchs chargés dans Snowflake RAW.MATCHES")
+    else:
+        print("⚠️ Aucun match récupéré, RAW.MATCHES inchangée")
 if __name__== "__main__":
-    fetch_and_load_matches(seasons=[2021, 2022, 2023, 2024])
+    try:
+        asyncio.run(fetch_and_load_matches(seasons=[2021, 2022, 2023, 2024]))
+    finally:
+        if _CONNECTION is not None:
+            _CONNECTION.close()
+        if _CLIENT is not None:
+            _CLIENT.close()
@@ -0,0 +1,37 @@
+"""
+PostgreSQL Engine Factory
+One pooled SQLAlchemy engine per process, shared by the loaders
+"""
+import os
+from functools import lru_cache
+from urllib.parse import quote_plus
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+load_dotenv()
+
+# Pool tuning: pre-ping drops connections the server closed, recycle renews
+# them before PostgreSQL or a proxy kills idle connections
+POOL_OPTIONS = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_pre_ping': True,
+    'pool_recycle': 1800,
+}
+
+
+def get_db_url() -> str:
+    """Build the psycopg2 URL from DB_* environment variables"""
+    db_pass = quote_plus(os.environ['DB_PASS'])
+    return (
+        f"postgresql+psycopg2://{os.environ['DB_USER']}:{db_pass}"
+        f"@{os.environ['DB_HOST']}:{os.environ['DB_PORT']}/{os.environ['DB_NAME']}"
+    )
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> Engine:
+    """Return the process-wide engine, created on first use"""
+    return create_engine(get_db_url(), **POOL_OPTIONS)
@@ -1,11 +1,13 @@
 from dotenv import load_dotenv
 import os 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import httpx
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Dict, Any
-import json
+import orjson
 import time  # Import nécessaire pour le rate limiting
 load_dotenv()
 
@@ -19,19 +21,56 @@ HEADERS = {"X-Auth-Token": os.environ["FOOTBALL_API_TOKEN"]}
 LANDING_DIR.mkdir(parents=True, exist_ok=True)
 RAW_DIR.mkdir(parents=True, exist_ok=True)
 
+# Client HTTP partagé : une seule pool de connexions (TLS + HTTP/2) par processus
+_CLIENT = None
+
+def get_http_client() -> httpx.Client:
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = httpx.Client(
+            timeout=60,
+            headers=HEADERS,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=10)
+        )
+    return _CLIENT
+
 def _save_json(data, filename: str) -> Path:
     path = LANDING_DIR / filename
     enriched = {"extracted_at": datetime.now().isoformat(), "data": data}
-    path.write_text(json.dumps(enriched, indent=2, ensure_ascii=False),encoding="utf-8")
+    # orjson écrit directement de l'UTF-8 (équivalent de ensure_ascii=False)
+    path.write_bytes(orjson.dumps(enriched, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
     return path 
+def flatten_match(match: Dict[str, Any], code: str, prefix: str = "") -> Dict[str, Any]:
+    """Aplatit un match en dict plat, mêmes noms de colonnes que json_normalize(sep="_")"""
+    flat = {}
+    for key, value in match.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_match(value, code, prefix=f"{name}_"))
+        else:
+            flat[name] = value
+    if not prefix:
+        flat["competition_code"] = code
+    return flat
+def downcast_numeric(df: pd.DataFrame) -> pd.DataFrame:
+    """Réduit les colonnes numériques (scores, ids, journées) au plus petit type entier possible"""
+    for col in df.select_dtypes(include='number').columns:
+        values = df[col]
+        if values.dtype.kind == 'f':
+            if not values.dropna().mod(1).eq(0).all():
+                continue
+            # Entiers avec valeurs manquantes (scores des matchs à venir) -> entier nullable
+            values = values.astype('Int64')
+        df[col] = pd.to_numeric(values, downcast='integer')
+    return df
 def fetch_competitions():
     """FETCH COMPETITONS FROM THE API"""
     url = f"{API_BASE}/competitions"
     try: 
-        with httpx.Client(timeout=60) as client :
-            response = client.get(url, headers = HEADERS)
-            response.raise_for_status()
-            data = response.json()
+        response = get_http_client().get(url)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
         # Normalisation minimale
         if "competitions" in data:
             comp = pd.json_normalize(data["competitions"])
@@ -45,35 +84,47 @@ def fetch_competitions():
 def fetch_matches_save(season: int = 2024, leagues: list = None):
     if leagues is None :
         leagues= ["PL","FL1","PD"]
-    frames = []
-    with httpx.Client(timeout=60) as client: 
-        for code in leagues: 
-            print(f"Récupération des matches pour {code}")
-            try :
-                    url = f"{API_BASE}/competitions/{code}/matches?season={season}"
-                    response = client.get(url , headers = HEADERS)
-                    if response.status_code == 429:
-                        print (f"Rate limit atteint pour {code}. Pause de 60s...")
-                        time.sleep(61)
-                        response = client.get(url, headers=HEADERS) # Retry
-                    response.raise_for_status()
-                    data = response.json()
-                    _save_json(data, f"matches_{code}_{season}.json")
-                    # Aplatissement avec séparateur pour éviter les conflits de noms
-                    matches = pd.json_normalize(data.get("matches", []), sep="_")
-                    if not matches.empty:
-                        matches["competition_code"] = code
-                        frames.append(matches)
-                        print(f"{len(matches)} matches récupérés.")
-                    time.sleep(6) 
-            except httpx.HTTPError as e:
-                    print(f"Erreur lors de la récupération des matches pour {code} : {e}")
-                    continue
-        if frames:
-            all_matches = pd.concat(frames, ignore_index= True)
-            output_path = LANDING_DIR / f"all_matches_{season}.parquet"
-            all_matches.to_parquet(output_path, index= False)
-            print(f"Tous les matches sauvegardés dans {output_path}")
+    records = []
+    client = get_http_client()
+    for code in leagues: 
+        print(f"Récupération des matches pour {code}")
+        try :
+                url = f"{API_BASE}/competitions/{code}/matches?season={season}"
+                response = client.get(url)
+                if response.status_code == 429:
+                    print (f"Rate limit atteint pour {code}. Pause de 60s...")
+                    time.sleep(61)
+                    response = client.get(url) # Retry
+                response.raise_for_status()
+                data = orjson.loads(response.content)
+                _save_json(data, f"matches_{code}_{season}.json")
+                # Aplatissement avec séparateur pour éviter les conflits de noms
+                matches = [flatten_match(match, code) for match in data.get("matches", [])]
+                if matches:
+                    records.extend(matches)
+                    print(f"{len(matches)} matches récupérés.")
+                time.sleep(6) 
+        except httpx.HTTPError as e:
+                print(f"Erreur lors de la récupération des matches pour {code} : {e}")
+                continue
+    if records:
+        # Un seul DataFrame pour toutes les ligues, pas de concat
+        all_matches = pd.DataFrame.from_records(records)
+        all_matches = downcast_numeric(all_matches)
+        # Peu de valeurs distinctes : stocké en dictionnaire dans le Parquet
+        all_matches["competition_code"] = all_matches["competition_code"].astype("category")
+        output_path = LANDING_DIR / f"all_matches_{season}.parquet"
+        table = pa.Table.from_pandas(all_matches, preserve_index=False)
+        pq.write_table(
+            table,
+            output_path,
+            compression="zstd",
+            compression_level=3,
+            row_group_size=500_000,
+            use_dictionary=True,  # noms d'équipes / codes répétés
+            data_page_size=1 << 20
+        )
+        print(f"Tous les matches sauvegardés dans {output_path}")
 if __name__ == "__main__":
     fetch_competitions()
     fetch_matches_save()
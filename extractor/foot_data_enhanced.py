@@ -1,15 +1,25 @@
 """
 Enhanced Football Data Extractor with Logging and Error Handling
 """
+import io
 import os
-import json
+import hashlib
+import shutil
 import time
+import random
+import asyncio
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 from dotenv import load_dotenv
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+import pyarrow.json as pa_json
+import orjson
 import httpx
 
 # Configure logging
@@ -30,6 +40,10 @@ API_BASE = "https://api.football-data.org/v4"
 DATA_DIR = Path(os.getenv("DATA_DIR", "./data"))
 LANDING_DIR = DATA_DIR / "landing"
 RAW_DIR = DATA_DIR / "raw"
+# Hive-partitioned copy of the matches: matches/season_year=2024/competition_code=PL/...
+MATCHES_DATASET_DIR = LANDING_DIR / "matches"
+# Last response body + ETag per URL, for conditional (If-None-Match) requests
+HTTP_CACHE_DIR = DATA_DIR / "http_cache"
 API_TOKEN = os.environ.get("FOOTBALL_API_TOKEN")
 
 # Validate configuration
@@ -39,77 +53,239 @@ if not API_TOKEN:
 
 HEADERS = {"X-Auth-Token": API_TOKEN}
 
+# ZSTD level 3: smaller files than snappy at about the same write/read speed
+PARQUET_WRITE_OPTIONS = {
+    "compression": "zstd",
+    "compression_level": 3,
+    "row_group_size": 500_000,
+    "use_dictionary": True,
+}
+
+MATCHES_PARTITIONING = ds.partitioning(
+    pa.schema([("season_year", pa.int64()), ("competition_code", pa.string())]),
+    flavor="hive"
+)
+
+# Low-cardinality match columns kept dictionary-encoded (pandas category once loaded).
+# competition_code stays plain: it is a partition key of MATCHES_PARTITIONING
+CATEGORICAL_COLUMNS = ["status", "stage", "group", "homeTeam_name", "awayTeam_name"]
+
+# Returned when a league/season has no matches or its request failed
+EMPTY_TABLE = pa.table({})
+
+# Responses worth retrying: rate limit and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# football-data.org free tier: 10 requests per minute
+REQUEST_INTERVAL = 6
+MAX_CONCURRENT_REQUESTS = 4
+
+
+class RequestPacer:
+    """Spaces request starts at least `interval` seconds apart across all tasks"""
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+    
+    async def wait(self):
+        """Wait for this request's start slot; the request itself runs unpaced"""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next_start - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_start = loop.time() + self.interval
+
 # Ensure directories exist
 LANDING_DIR.mkdir(parents=True, exist_ok=True)
 RAW_DIR.mkdir(parents=True, exist_ok=True)
+HTTP_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 Path("logs").mkdir(exist_ok=True)
 
 
 class FootballDataExtractor:
     """Extract football data from API with proper error handling and retry logic"""
     
-    def __init__(self, max_retries: int = 3, retry_delay: int = 60):
+    def __init__(self, max_retries: int = 5, retry_delay: int = 60):
+        # retry_delay caps the exponential backoff between attempts
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.client = httpx.Client(timeout=60, headers=HEADERS)
         logger.info("FootballDataExtractor initialized")
     
-    def _make_request(self, url: str, retry_count: int = 0) -> Dict[str, Any]:
-        """Make HTTP request with retry logic"""
+    def _cache_paths(self, url: str):
+        """ETag and body files caching the last successful response for url"""
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return HTTP_CACHE_DIR / f"{key}.etag", HTTP_CACHE_DIR / f"{key}.json"
+    
+    def _conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match header when a cached response exists for url"""
+        etag_path, body_path = self._cache_paths(url)
+        if etag_path.exists() and body_path.exists():
+            return {"If-None-Match": etag_path.read_text(encoding="utf-8")}
+        return {}
+    
+    def _read_cached(self, url: str) -> bytes:
+        """Body of the cached response, used on 304 Not Modified"""
+        logger.info("Not modified, using cached response: %s", url)
+        _, body_path = self._cache_paths(url)
+        return body_path.read_bytes()
+    
+    def _store_cached(self, url: str, response: httpx.Response):
+        """Keep the response body when the API sent an ETag for it"""
+        etag = response.headers.get("ETag")
+        if not etag:
+            return
+        etag_path, body_path = self._cache_paths(url)
+        body_path.write_bytes(response.content)
+        etag_path.write_text(etag, encoding="utf-8")
+    
+    def _retry_wait(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Seconds before the next attempt: server hint if sent, else backoff with jitter"""
+        if response is not None:
+            for header in ("Retry-After", "X-RequestCounter-Reset"):
+                value = response.headers.get(header, "")
+                if value.isdigit():
+                    return float(value)
+        return min(self.retry_delay, 2 ** attempt) + random.uniform(0, 1)
+    
+    def _should_retry(
+        self, 
+        url: str, 
+        attempt: int, 
+        response: Optional[httpx.Response] = None, 
+        error: Optional[Exception] = None
+    ) -> bool:
+        """Whether a failed attempt (error or retryable status) gets another try"""
+        if error is None and response.status_code not in RETRYABLE_STATUS_CODES:
+            return False
+        if attempt >= self.max_retries:
+            logger.error("Max retries reached for %s", url)
+            return False
+        reason = error if error is not None else f"HTTP {response.status_code}"
+        logger.warning("%s for %s, retry %s/%s", reason, url, attempt + 1, self.max_retries)
+        return True
+    
+    def _read_response(self, url: str, response: httpx.Response) -> bytes:
+        """Raw body of a final response, falling back to the cache on 304 Not Modified"""
+        if response.status_code == 304:
+            return self._read_cached(url)
         try:
-            logger.info(f"Making request to: {url}")
-            response = self.client.get(url)
-            
-            # Handle rate limiting
-            if response.status_code == 429:
-                if retry_count < self.max_retries:
-                    logger.warning(f"Rate limit hit. Waiting {self.retry_delay}s before retry {retry_count + 1}/{self.max_retries}")
-                    time.sleep(self.retry_delay)
-                    return self._make_request(url, retry_count + 1)
-                else:
-                    logger.error(f"Max retries reached for {url}")
-                    raise httpx.HTTPStatusError(f"Rate limit exceeded", request=response.request, response=response)
-            
             response.raise_for_status()
-            logger.info(f"Request successful: {url}")
-            return response.json()
-            
         except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error for {url}: {e}")
-            raise
-        except httpx.RequestError as e:
-            logger.error(f"Request error for {url}: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"Unexpected error for {url}: {e}")
+            logger.error("HTTP error for %s: %s", url, e)
             raise
+        logger.info("Request successful: %s", url)
+        self._store_cached(url, response)
+        return response.content
+    
+    def _make_request(self, url: str) -> bytes:
+        """Make HTTP request, retrying rate limits, 5xx and network errors, returns the raw body"""
+        logger.info("Making request to: %s", url)
+        attempt = 0
+        while True:
+            try:
+                response = self.client.get(url, headers=self._conditional_headers(url))
+            except httpx.TransportError as e:
+                if not self._should_retry(url, attempt, error=e):
+                    logger.error("Request error for %s: %s", url, e)
+                    raise
+                time.sleep(self._retry_wait(attempt))
+            else:
+                if not self._should_retry(url, attempt, response=response):
+                    return self._read_response(url, response)
+                time.sleep(self._retry_wait(attempt, response))
+            attempt += 1
     
-    def _save_json(self, data: Dict[str, Any], filename: str) -> Path:
-        """Save data as JSON with metadata"""
+    async def _make_request_async(
+        self, 
+        client: httpx.AsyncClient, 
+        pacer: RequestPacer, 
+        url: str
+    ) -> bytes:
+        """Async variant of _make_request, used for concurrent match fetches"""
+        logger.info("Making request to: %s", url)
+        attempt = 0
+        while True:
+            # Retries count against the rate limit too
+            await pacer.wait()
+            try:
+                response = await client.get(url, headers=self._conditional_headers(url))
+            except httpx.TransportError as e:
+                if not self._should_retry(url, attempt, error=e):
+                    logger.error("Request error for %s: %s", url, e)
+                    raise
+                await asyncio.sleep(self._retry_wait(attempt))
+            else:
+                if not self._should_retry(url, attempt, response=response):
+                    return self._read_response(url, response)
+                await asyncio.sleep(self._retry_wait(attempt, response))
+            attempt += 1
+    
+    def _save_json(self, raw: bytes, data: Dict[str, Any], filename: str) -> Path:
+        """Save the raw response body as is, with metadata in a .meta.json sidecar"""
         try:
             path = LANDING_DIR / filename
-            enriched = {
+            path.write_bytes(raw)
+            metadata = {
                 "extracted_at": datetime.now().isoformat(),
-                "data": data,
-                "record_count": len(data.get("matches", [])) if "matches" in data else len(data.get("competitions", []))
+                "record_count": len(data.get("matches") or data.get("competitions") or [])
             }
-            path.write_text(json.dumps(enriched, indent=2, ensure_ascii=False), encoding="utf-8")
-            logger.info(f"Data saved to {path}")
+            path.with_suffix(".meta.json").write_bytes(orjson.dumps(metadata))
+            logger.info("Data saved to %s", path)
             return path
         except Exception as e:
-            logger.error(f"Error saving JSON to {filename}: {e}")
+            logger.error("Error saving JSON to %s: %s", filename, e)
             raise
     
-    def _save_parquet(self, df: pd.DataFrame, filename: str) -> Path:
-        """Save DataFrame as Parquet"""
+    def _save_parquet(self, data: Union[pd.DataFrame, pa.Table], filename: str) -> Path:
+        """Save a DataFrame or Arrow table as Parquet"""
         try:
             path = LANDING_DIR / filename
-            df.to_parquet(path, index=False)
-            logger.info(f"Parquet saved to {path} with {len(df)} records")
+            table = pa.Table.from_pandas(data, preserve_index=False) if isinstance(data, pd.DataFrame) else data
+            pq.write_table(table, path, **PARQUET_WRITE_OPTIONS)
+            logger.info("Parquet saved to %s with %s records", path, table.num_rows)
             return path
         except Exception as e:
-            logger.error(f"Error saving Parquet to {filename}: {e}")
+            logger.error("Error saving Parquet to %s: %s", filename, e)
+            raise
+    
+    def _save_season_tables(self, tables: List[pa.Table], season: int) -> int:
+        """Concatenate Arrow tables for one season and save all_matches_{season}.parquet"""
+        # Leagues may disagree on columns or numeric types; promote instead of failing
+        season_table = pa.concat_tables(tables, promote_options="permissive")
+        path = LANDING_DIR / f"all_matches_{season}.parquet"
+        try:
+            pq.write_table(season_table, path, **PARQUET_WRITE_OPTIONS)
+            logger.info("Parquet saved to %s with %s records", path, season_table.num_rows)
+            self._save_matches_partitions(season_table, season)
+        except Exception as e:
+            logger.error("Error saving Parquet to %s: %s", path.name, e)
             raise
+        return season_table.num_rows
+    
+    def _save_matches_partitions(self, season_table: pa.Table, season: int):
+        """Write one season's matches into the (season_year, competition_code) partitioned dataset"""
+        # The loader reads the whole season directory: drop leagues this run did not produce
+        shutil.rmtree(MATCHES_DATASET_DIR / f"season_year={season}", ignore_errors=True)
+        file_options = ds.ParquetFileFormat().make_write_options(
+            compression=PARQUET_WRITE_OPTIONS["compression"],
+            compression_level=PARQUET_WRITE_OPTIONS["compression_level"],
+            use_dictionary=PARQUET_WRITE_OPTIONS["use_dictionary"]
+        )
+        # Other seasons' partitions stay untouched
+        ds.write_dataset(
+            season_table,
+            MATCHES_DATASET_DIR,
+            format="parquet",
+            partitioning=MATCHES_PARTITIONING,
+            file_options=file_options,
+            max_rows_per_group=PARQUET_WRITE_OPTIONS["row_group_size"],
+            existing_data_behavior="delete_matching"
+        )
+        logger.info("Partitioned matches saved to %s", MATCHES_DATASET_DIR)
     
     def fetch_competitions(self) -> pd.DataFrame:
         """Fetch competitions from API"""
@@ -117,7 +293,8 @@ class FootballDataExtractor:
         url = f"{API_BASE}/competitions"
         
         try:
-            data = self._make_request(url)
+            # orjson decodes the raw body in C, faster than stdlib json
+            data = orjson.loads(self._make_request(url))
             
             if "competitions" not in data:
                 logger.warning("No competitions found in response")
@@ -134,36 +311,152 @@ class FootballDataExtractor:
             logger.error(f"Failed to fetch competitions: {e}")
             raise
     
-    def fetch_matches_for_league(self, league_code: str, season: int) -> pd.DataFrame:
-        """Fetch matches for a specific league and season"""
+    def _load_landed_matches(self, league_code: str, season: int) -> Optional[Dict[str, Any]]:
+        """Return the landed JSON of a completed season, or None if it must be fetched"""
+        path = LANDING_DIR / f"matches_{league_code}_{season}.json"
+        # Past seasons no longer change, so a landed copy is always fresh
+        if not path.exists() or season >= datetime.now().year - 1:
+            return None
+        try:
+            data = orjson.loads(path.read_bytes())
+        except orjson.JSONDecodeError as e:
+            logger.warning(f"Ignoring unreadable landing file {path}: {e}")
+            return None
+        # Files landed before the .meta.json sidecar wrap the body in "data"
+        if "extracted_at" in data:
+            data = data.get("data", {})
+        logger.info(f"Using landed matches for {league_code} - {season}, skipping API call")
+        return data
+    
+    def _fetch_league_table(self, league_code: str, season: int) -> pa.Table:
+        """Fetch matches for a specific league and season, raising on request errors"""
         logger.info(f"Fetching matches for {league_code} - Season {season}")
         url = f"{API_BASE}/competitions/{league_code}/matches?season={season}"
         
+        landed = self._load_landed_matches(league_code, season)
+        if landed is not None:
+            return self._process_matches(landed, league_code, season)
+        
+        raw = self._make_request(url)
+        return self._process_matches(orjson.loads(raw), league_code, season, raw=raw)
+    
+    def fetch_matches_for_league(self, league_code: str, season: int) -> pa.Table:
+        """Fetch matches for a specific league and season"""
         try:
-            data = self._make_request(url)
-            
-            # Save raw JSON
-            self._save_json(data, f"matches_{league_code}_{season}.json")
-            
-            # Process matches
-            if "matches" not in data or not data["matches"]:
-                logger.warning(f"No matches found for {league_code} - {season}")
-                return pd.DataFrame()
-            
-            matches = pd.json_normalize(data["matches"], sep="_")
-            matches["competition_code"] = league_code
-            matches["season_year"] = season
-            
-            logger.info(f"Fetched {len(matches)} matches for {league_code}")
-            return matches
+            return self._fetch_league_table(league_code, season)
             
         except Exception as e:
             logger.error(f"Failed to fetch matches for {league_code} - {season}: {e}")
-            # Return empty DataFrame to continue with other leagues
-            return pd.DataFrame()
+            # Return an empty table to continue with other leagues
+            return EMPTY_TABLE
+    
+    async def fetch_matches_for_league_async(
+        self, 
+        client: httpx.AsyncClient, 
+        semaphore: asyncio.Semaphore, 
+        pacer: RequestPacer, 
+        league_code: str, 
+        season: int
+    ) -> pa.Table:
+        """Async variant of fetch_matches_for_league, paced to the API rate limit"""
+        logger.info(f"Fetching matches for {league_code} - Season {season}")
+        url = f"{API_BASE}/competitions/{league_code}/matches?season={season}"
+        
+        # Landed past seasons need neither a request nor a rate-limit slot
+        landed = self._load_landed_matches(league_code, season)
+        if landed is not None:
+            return self._process_matches(landed, league_code, season)
+        
+        # The semaphore caps requests in flight; the pacer spaces their starts
+        async with semaphore:
+            try:
+                raw = await self._make_request_async(client, pacer, url)
+            except Exception as e:
+                logger.error(f"Failed to fetch matches for {league_code} - {season}: {e}")
+                return EMPTY_TABLE
+        
+        return self._process_matches(orjson.loads(raw), league_code, season, raw=raw)
+    
+    def _process_matches(
+        self, 
+        data: Dict[str, Any], 
+        league_code: str, 
+        season: int, 
+        raw: Optional[bytes] = None
+    ) -> pa.Table:
+        """Save the raw response and parse its matches into a flat Arrow table"""
+        # Save raw JSON (landed files, passed without raw, are kept as is)
+        if raw is not None:
+            self._save_json(raw, data, f"matches_{league_code}_{season}.json")
+        
+        # Process matches
+        if "matches" not in data or not data["matches"]:
+            logger.warning(f"No matches found for {league_code} - {season}")
+            return EMPTY_TABLE
+        
+        # Columnar parse as newline-delimited JSON, no per-row Python objects
+        ndjson = io.BytesIO(b"".join(orjson.dumps(match) + b"\n" for match in data["matches"]))
+        table = pa_json.read_json(ndjson, read_options=pa_json.ReadOptions(block_size=8 << 20))
+        
+        # Same column names as json_normalize(sep="_"): homeTeam_name, score_fullTime_home...
+        while any(pa.types.is_struct(field.type) for field in table.schema):
+            table = table.flatten()
+        table = table.rename_columns([name.replace(".", "_") for name in table.column_names])
+        
+        for col in CATEGORICAL_COLUMNS:
+            index = table.schema.get_field_index(col)
+            if index != -1 and pa.types.is_string(table.schema.field(index).type):
+                table = table.set_column(index, col, pc.dictionary_encode(table.column(index)))
+        
+        table = table.append_column("competition_code", pa.array([league_code] * table.num_rows))
+        table = table.append_column("season_year", pa.array([season] * table.num_rows, pa.int64()))
+        
+        logger.info(f"Fetched {table.num_rows} matches for {league_code}")
+        return table
+    
+    def fetch_and_save_league(self, league_code: str, season: int) -> Optional[str]:
+        """Fetch one league/season and save it as its own Parquet file.
+        
+        Request errors propagate so the caller's task fails. Returns the saved
+        path, or None when the league/season has no matches.
+        """
+        # A file from an earlier run must never stand in for this fetch
+        path = LANDING_DIR / f"matches_{league_code}_{season}.parquet"
+        path.unlink(missing_ok=True)
+        
+        table = self._fetch_league_table(league_code, season)
+        if table.num_rows == 0:
+            return None
+        
+        return str(self._save_parquet(table, path.name))
+    
+    def combine_league_files(self, paths: List[str], seasons: List[int]) -> int:
+        """Combine the given per-league Parquet files into one all_matches_{season}.parquet per season"""
+        total = 0
+        
+        by_season = {season: [] for season in seasons}
+        for path in paths:
+            # matches_{league}_{season}.parquet
+            season = int(Path(path).stem.rsplit("_", 1)[1])
+            by_season.setdefault(season, []).append(path)
+        
+        for season, season_paths in by_season.items():
+            if season_paths:
+                total += self._save_season_tables([pq.read_table(path) for path in season_paths], season)
+            else:
+                logger.warning(f"No extracted file for season {season}")
+                # Drop the previous run's season file so validation sees it missing
+                (LANDING_DIR / f"all_matches_{season}.parquet").unlink(missing_ok=True)
+        
+        if total == 0:
+            logger.error("No data extracted from any source")
+            raise ValueError("All extractions failed")
+        
+        logger.info(f"Total matches extracted: {total}")
+        return total
     
-    def fetch_all_matches(self, leagues: List[str] = None, seasons: List[int] = None) -> pd.DataFrame:
-        """Fetch matches for multiple leagues and seasons"""
+    def fetch_all_matches(self, leagues: List[str] = None, seasons: List[int] = None) -> int:
+        """Fetch matches for multiple leagues and seasons, returns the number of matches saved"""
         if leagues is None:
             leagues = ["PL", "FL1", "PD"]
         if seasons is None:
@@ -171,43 +464,58 @@ class FootballDataExtractor:
         
         logger.info(f"Starting extraction for leagues: {leagues}, seasons: {seasons}")
         
-        all_frames = []
+        # Each league/season is saved as soon as it arrives, so a late failure
+        # keeps everything fetched before it
+        paths, failed_extractions = asyncio.run(self._fetch_matches_concurrently(leagues, seasons))
+        
+        if failed_extractions:
+            logger.warning(f"Failed or empty extractions: {', '.join(sorted(failed_extractions))}")
+        
+        return self.combine_league_files(paths, seasons)
+    
+    async def _fetch_league_async(
+        self, 
+        client: httpx.AsyncClient, 
+        semaphore: asyncio.Semaphore, 
+        pacer: RequestPacer, 
+        league_code: str, 
+        season: int
+    ) -> tuple:
+        """fetch_matches_for_league_async, tagged with its league/season for as_completed"""
+        table = await self.fetch_matches_for_league_async(client, semaphore, pacer, league_code, season)
+        return league_code, season, table
+    
+    async def _fetch_matches_concurrently(self, leagues: List[str], seasons: List[int]) -> tuple:
+        """Fetch every league/season pair over one async client, saving each as it completes.
+        
+        Returns the paths saved by this call and the failed league/season pairs.
+        """
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        pacer = RequestPacer(REQUEST_INTERVAL)
+        paths = []
         failed_extractions = []
         
-        for season in seasons:
-            for league in leagues:
-                try:
-                    df = self.fetch_matches_for_league(league, season)
-                    if not df.empty:
-                        all_frames.append(df)
-                    
-                    # Rate limiting delay between requests
-                    time.sleep(6)
-                    
-                except Exception as e:
-                    logger.error(f"Extraction failed for {league} - {season}: {e}")
+        async with httpx.AsyncClient(
+            timeout=60,
+            headers=HEADERS,
+            http2=True,
+            limits=httpx.Limits(max_connections=10)
+        ) as client:
+            tasks = [
+                self._fetch_league_async(client, semaphore, pacer, league, season)
+                for season in seasons for league in leagues
+            ]
+            for next_done in asyncio.as_completed(tasks):
+                # Failed requests come back as empty tables, like fetch_matches_for_league
+                league, season, table = await next_done
+                if table.num_rows == 0:
                     failed_extractions.append(f"{league}_{season}")
                     continue
+                # Write off the event loop so it overlaps with in-flight requests
+                path = await asyncio.to_thread(self._save_parquet, table, f"matches_{league}_{season}.parquet")
+                paths.append(str(path))
         
-        # Combine all data
-        if all_frames:
-            combined = pd.concat(all_frames, ignore_index=True)
-            
-            # Save combined data
-            for season in seasons:
-                season_data = combined[combined['season_year'] == season]
-                if not season_data.empty:
-                    self._save_parquet(season_data, f"all_matches_{season}.parquet")
-            
-            logger.info(f"Total matches extracted: {len(combined)}")
-            
-            if failed_extractions:
-                logger.warning(f"Failed extractions: {', '.join(failed_extractions)}")
-            
-            return combined
-        else:
-            logger.error("No data extracted from any source")
-            raise ValueError("All extractions failed")
+        return paths, failed_extractions
     
     def close(self):
         """Close HTTP client"""
@@ -1,17 +1,16 @@
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import text
 from sqlalchemy.types import JSON
 import os 
 from dotenv import load_dotenv
 import numpy as np 
-import json
+import orjson
+from pg_copy import load_dataframe
+from db import get_engine
 
 load_dotenv()
-from urllib.parse import quote_plus
 
-db_pass = quote_plus(os.environ['DB_PASS'])
-db_url = f"postgresql+psycopg2://{os.environ['DB_USER']}:{db_pass}@{os.environ['DB_HOST']}:{os.environ['DB_PORT']}/{os.environ['DB_NAME']}"
-engine = create_engine(db_url)
+engine = get_engine()
 
 def get_data_dir():
     """Retourne le bon chemin selon l'environnement"""
@@ -23,23 +22,66 @@ def get_data_dir():
     else:
         return os.getenv("DATA_DIR", "./landing")
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    for col in df.columns:
-        if df[col].dtype == 'object':
-            sample = df[col].dropna().iloc[0] if not df[col].dropna().empty else None
-            if isinstance(sample, (list, dict, np.ndarray)):
-                df[col] = df[col].apply(lambda x: json.dumps(x, default=str) if isinstance(x, (list, dict, np.ndarray)) else None)
-    return df
+JSON_TYPES = (list, dict, np.ndarray)
 
-def get_dtype_mapping(df):
-    """Force les colonnes détectées comme JSON à utiliser le type JSON de Postgres"""
+def _json_default(x):
+    """Tableaux numpy imbriqués (listes Parquet) -> listes, le reste -> str"""
+    return x.tolist() if isinstance(x, np.ndarray) else str(x)
+
+def _to_json(x) -> str:
+    if isinstance(x, np.ndarray):
+        x = x.tolist()
+    return orjson.dumps(x, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+def prepare_for_postgres(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    """
+    Sérialise les colonnes conteneurs en JSON et force le type JSON de Postgres
+
+    Une seule passe sur les colonnes object : la première valeur non nulle
+    décide si la colonne est JSON (conteneur ou texte déjà sérialisé).
+    """
     dtypes = {}
-    for col in df.columns:
-        if df[col].dtype == 'object':
-            sample = df[col].dropna().iloc[0] if not df[col].dropna().empty else ""
-            if isinstance(sample, str) and (sample.startswith('{') or sample.startswith('[')):
-                dtypes[col] = JSON
-    return dtypes
+    for col in df.select_dtypes(include='object').columns:
+        idx = df[col].first_valid_index()
+        if idx is None:
+            continue
+        sample = df[col].iat[df.index.get_loc(idx)]
+        if isinstance(sample, JSON_TYPES):
+            # Type testé une seule fois par cellule, sérialisation limitée aux conteneurs
+            is_container = df[col].map(type).isin(JSON_TYPES)
+            serialized = pd.Series(None, index=df.index, dtype=object)
+            serialized[is_container] = [_to_json(x) for x in df.loc[is_container, col]]
+            df[col] = serialized
+            dtypes[col] = JSON
+        elif isinstance(sample, str) and sample.startswith(('{', '[')):
+            dtypes[col] = JSON
+    return df, dtypes
+
+def ensure_match_year(conn, schema, table_name):
+    """
+    Ajoute la colonne générée match_year (indexée) pour les agrégations par année
+
+    "utcDate" est chargé en timestamptz : une table créée par une ancienne
+    version (colonne texte) est convertie une seule fois ici.
+    """
+    column_type = conn.execute(text("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = :schema AND table_name = :table AND column_name = 'utcDate'
+    """), {'schema': schema, 'table': table_name}).scalar()
+    if column_type != 'timestamp with time zone':
+        conn.execute(text(
+            f'ALTER TABLE {schema}.{table_name} '
+            f'ALTER COLUMN "utcDate" TYPE timestamptz USING "utcDate"::timestamptz'
+        ))
+    # AT TIME ZONE 'UTC' rend l'expression immuable (requis pour une colonne générée)
+    conn.execute(text(
+        f'ALTER TABLE {schema}.{table_name} ADD COLUMN IF NOT EXISTS match_year int '
+        f'GENERATED ALWAYS AS (EXTRACT(YEAR FROM "utcDate" AT TIME ZONE \'UTC\')) STORED'
+    ))
+    conn.execute(text(
+        f'CREATE INDEX IF NOT EXISTS {table_name}_match_year_idx '
+        f'ON {schema}.{table_name} (match_year)'
+    ))
 
 def load_parquet_to_postgres(schema='bronze', season=2023):
     """
@@ -76,19 +118,27 @@ def load_parquet_to_postgres(schema='bronze', season=2023):
         print(f"📥 Chargement: {file} → {schema}.{table_name}")
         
         # Charger et nettoyer les données
-        df = pd.read_parquet(file_path)
-        df = clean_data(df)
-        dtype_mapping = get_dtype_mapping(df)
+        df = pd.read_parquet(file_path, engine="pyarrow")
+        df, dtype_mapping = prepare_for_postgres(df)
+        is_matches = table_name == 'all_matches'
+        if is_matches:
+            # timestamptz dès le chargement (encodé nativement par le COPY binaire)
+            df['utcDate'] = pd.to_datetime(df['utcDate'], utc=True)
         
-        # Charger dans PostgreSQL
-        df.to_sql(
-            table_name, 
-            engine, 
-            schema=schema,  #  Utiliser le schema (bronze, silver, gold)
-            if_exists='append',  #  APPEND au lieu de REPLACE pour cumuler les saisons
-            index=False, 
-            dtype=dtype_mapping
-        )
+        # Charger dans PostgreSQL : to_sql crée la table, COPY binaire insère les lignes
+        with engine.begin() as conn:
+            df.head(0).to_sql(
+                table_name, 
+                conn, 
+                schema=schema,  #  Utiliser le schema (bronze, silver, gold)
+                if_exists='append',  #  APPEND au lieu de REPLACE pour cumuler les saisons
+                index=False, 
+                dtype=dtype_mapping
+            )
+            if is_matches:
+                ensure_match_year(conn, schema, table_name)
+            with conn.connection.cursor() as cursor:
+                load_dataframe(cursor, df, schema, table_name)
         
         print(f" Table {schema}.{table_name} chargée avec succès ({len(df)} lignes)")
     
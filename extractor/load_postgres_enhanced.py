@@ -4,13 +4,21 @@ Enhanced PostgreSQL Loader with Error Handling and Data Validation
 import os
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from itertools import chain
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, List, Optional
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
 from dotenv import load_dotenv
+from pg_copy import load_dataframe
 
 # Configure logging
 logging.basicConfig(
@@ -35,7 +43,19 @@ DB_CONFIG = {
 }
 
 DATA_DIR = Path(os.getenv("DATA_DIR", "./data"))
+# Rows per Arrow record batch when streaming Parquet files into COPY
+LOAD_BATCH_SIZE = 50_000
+# Pooled connections, also the cap on seasons loaded concurrently
+POOL_SIZE = 4
+# Memory for building the live table's index, per transaction only
+INDEX_MAINTENANCE_WORK_MEM = '256MB'
 LANDING_DIR = DATA_DIR / "landing"
+# Partitioned matches written by FootballDataExtractor
+MATCHES_DATASET_DIR = LANDING_DIR / "matches"
+MATCHES_PARTITIONING = ds.partitioning(
+    pa.schema([("season_year", pa.int64()), ("competition_code", pa.string())]),
+    flavor="hive"
+)
 
 # Ensure logs directory exists
 Path("logs").mkdir(exist_ok=True)
@@ -55,16 +75,16 @@ class PostgreSQLLoader:
                 f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}"
                 f"@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
             )
-            self.engine = create_engine(conn_string)
+            self.engine = create_engine(conn_string, pool_size=POOL_SIZE, max_overflow=0)
             
             # Test connection
             with self.engine.connect() as conn:
                 conn.execute(text("SELECT 1"))
             
-            logger.info(f"Connected to database: {DB_CONFIG['database']}")
+            logger.info("Connected to database: %s", DB_CONFIG['database'])
             
         except SQLAlchemyError as e:
-            logger.error(f"Database connection failed: {e}")
+            logger.error("Database connection failed: %s", e)
             raise
     
     def _create_schema(self, schema_name: str):
@@ -73,33 +93,118 @@ class PostgreSQLLoader:
             with self.engine.connect() as conn:
                 conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema_name}"))
                 conn.commit()
-            logger.info(f"Schema '{schema_name}' ensured")
+            logger.info("Schema '%s' ensured", schema_name)
         except SQLAlchemyError as e:
-            logger.error(f"Failed to create schema '{schema_name}': {e}")
+            logger.error("Failed to create schema '%s': %s", schema_name, e)
             raise
     
     def _validate_dataframe(self, df: pd.DataFrame, table_name: str) -> bool:
         """Validate DataFrame before loading"""
         if df.empty:
-            logger.warning(f"DataFrame for {table_name} is empty")
+            logger.warning("DataFrame for %s is empty", table_name)
             return False
         
-        logger.info(f"Validating {len(df)} records for {table_name}")
-        logger.info(f"Columns: {list(df.columns)}")
+        logger.info("Validating %s records for %s", len(df), table_name)
+        logger.info("Columns: %s", list(df.columns))
         
-        # Check for all null rows
-        all_null_rows = df.isnull().all(axis=1).sum()
+        # Check for all null rows: OR column masks into one row vector, stop once every row has a value
+        any_non_null = np.zeros(len(df), dtype=bool)
+        for col in df.columns:
+            any_non_null |= df[col].notna().to_numpy()
+            if any_non_null.all():
+                break
+        all_null_rows = int(np.count_nonzero(~any_non_null))
         if all_null_rows > 0:
-            logger.warning(f"Found {all_null_rows} completely null rows")
+            logger.warning("Found %s completely null rows", all_null_rows)
         
         return True
     
+    def _prepare_batch(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert numpy arrays and complex objects to JSON strings for PostgreSQL"""
+        for col in df.columns:
+            if df[col].dtype == 'object':
+                def convert_to_json(x):
+                    if x is None or (isinstance(x, float) and pd.isna(x)):
+                        return None
+                    if isinstance(x, np.ndarray):
+                        return json.dumps(x.tolist())
+                    if isinstance(x, (list, dict)):
+                        return json.dumps(x)
+                    return x
+                df[col] = df[col].apply(convert_to_json)
+        return df
+    
+    def _iter_batches(self, file_path: Path, table_name: str) -> Iterator[pd.DataFrame]:
+        """Stream a Parquet file as prepared DataFrames of at most LOAD_BATCH_SIZE rows"""
+        parquet_file = pq.ParquetFile(file_path)
+        yield from self._prepare_batches(parquet_file.iter_batches(batch_size=LOAD_BATCH_SIZE), table_name)
+    
+    def _prepare_batches(self, record_batches: Iterator[pa.RecordBatch], table_name: str) -> Iterator[pd.DataFrame]:
+        """Convert Arrow record batches to prepared DataFrames, skipping empty ones"""
+        for batch in record_batches:
+            df = self._prepare_batch(batch.to_pandas())
+            if self._validate_dataframe(df, table_name):
+                yield df
+    
+    def _create_table(self, conn, df: pd.DataFrame, table_name: str, schema: str, if_exists: str, unlogged: bool):
+        """Create the target table from a batch's schema (pandas handles DDL only)"""
+        df.head(0).to_sql(
+            name=table_name,
+            con=conn,
+            schema=schema,
+            if_exists=if_exists,
+            index=False
+        )
+        if unlogged:
+            # Skip WAL for bulk staging loads (no-op if already unlogged)
+            conn.execute(text(f"ALTER TABLE {schema}.{table_name} SET UNLOGGED"))
+    
+    def _ensure_table(self, df: pd.DataFrame, table_name: str, schema: str, unlogged: bool):
+        """Create the target table once, even when several loads append to it concurrently"""
+        qualified_name = f"{schema}.{table_name}"
+        with self.engine.begin() as conn:
+            # Only table creation is serialized; the COPYs themselves run in parallel
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {'name': qualified_name})
+            exists = conn.execute(
+                text("SELECT to_regclass(:name) IS NOT NULL"), {'name': qualified_name}
+            ).scalar()
+            if not exists:
+                self._create_table(conn, df, table_name, schema, 'append', unlogged)
+    
+    def _copy_to_table(
+        self, 
+        batches: Iterator[pd.DataFrame], 
+        table_name: str, 
+        schema: str, 
+        if_exists: str, 
+        unlogged: bool = False
+    ) -> int:
+        """Create the target table from the first batch's schema and COPY every batch into it"""
+        first = next(batches, None)
+        if first is None:
+            return 0
+        
+        # Appends create the table up front in its own short transaction, so
+        # concurrent loads into the same table don't queue behind each other
+        if if_exists == 'append':
+            self._ensure_table(first, table_name, schema, unlogged)
+        
+        total = 0
+        with self.engine.begin() as conn:
+            if if_exists != 'append':
+                self._create_table(conn, first, table_name, schema, if_exists, unlogged)
+            with conn.connection.cursor() as cursor:
+                for df in chain([first], batches):
+                    total += load_dataframe(cursor, df, schema, table_name)
+        return total
+    
     def load_parquet_to_postgres(
         self, 
         parquet_file: str, 
         table_name: str, 
         schema: str = 'bronze',
-        if_exists: str = 'replace'
+        if_exists: str = 'replace',
+        unlogged: bool = False
     ) -> int:
         """Load Parquet file to PostgreSQL table"""
         
@@ -108,102 +213,226 @@ class PostgreSQLLoader:
         try:
             # Check if file exists
             if not file_path.exists():
-                logger.error(f"File not found: {file_path}")
+                logger.error("File not found: %s", file_path)
                 raise FileNotFoundError(f"File not found: {file_path}")
             
-            logger.info(f"Loading {file_path} to {schema}.{table_name}")
-            
-            # Read parquet
-            df = pd.read_parquet(file_path)
-            
-            # Convert numpy arrays and complex objects to JSON strings for PostgreSQL
-            for col in df.columns:
-                if df[col].dtype == 'object':
-                    def convert_to_json(x):
-                        if x is None or (isinstance(x, float) and pd.isna(x)):
-                            return None
-                        if isinstance(x, np.ndarray):
-                            return json.dumps(x.tolist())
-                        if isinstance(x, (list, dict)):
-                            return json.dumps(x)
-                        return x
-                    df[col] = df[col].apply(convert_to_json)
-            
-            # Validate
-            if not self._validate_dataframe(df, table_name):
-                return 0
+            logger.info("Loading %s to %s.%s", file_path, schema, table_name)
             
             # Ensure schema exists
             self._create_schema(schema)
             
-            # Load to database in smaller chunks
-            rows_loaded = df.to_sql(
-                name=table_name,
-                con=self.engine,
-                schema=schema,
-                if_exists=if_exists,
-                index=False,
-                method='multi',
-                chunksize=100  # Smaller chunks to avoid SQL parameter limit
+            # Stream record batches through binary COPY, one transaction for the file
+            rows = self._copy_to_table(
+                self._iter_batches(file_path, table_name), table_name, schema, if_exists, unlogged
             )
             
-            logger.info(f"Successfully loaded {len(df)} rows to {schema}.{table_name}")
-            return len(df)
+            if rows == 0:
+                logger.warning("No rows loaded from %s", file_path)
+                return 0
+            
+            logger.info("Successfully loaded %s rows to %s.%s", rows, schema, table_name)
+            return rows
             
         except FileNotFoundError as e:
-            logger.error(f"File not found: {e}")
+            logger.error("File not found: %s", e)
             raise
         except pd.errors.ParserError as e:
-            logger.error(f"Error parsing Parquet file: {e}")
+            logger.error("Error parsing Parquet file: %s", e)
             raise
         except SQLAlchemyError as e:
-            logger.error(f"Database error while loading {table_name}: {e}")
+            logger.error("Database error while loading %s: %s", table_name, e)
             raise
         except Exception as e:
-            logger.error(f"Unexpected error loading {table_name}: {e}")
+            logger.error("Unexpected error loading %s: %s", table_name, e)
             raise
     
-    def load_all_matches(self, seasons: list = None):
-        """Load matches for multiple seasons"""
+    def load_matches_partition(
+        self, 
+        season: int, 
+        competition_codes: Optional[List[str]] = None, 
+        table_name: str = 'matches', 
+        schema: str = 'bronze',
+        if_exists: str = 'append',
+        unlogged: bool = False
+    ) -> int:
+        """Load one season (optionally some leagues) from the partitioned matches dataset"""
+        # Partition pruning: only the season's directory is listed, and the
+        # competition filter skips the other leagues' files unopened
+        season_files = sorted(str(path) for path in (MATCHES_DATASET_DIR / f"season_year={season}").rglob("*.parquet"))
+        if not season_files:
+            logger.error("No partitions for season %s in %s", season, MATCHES_DATASET_DIR)
+            raise FileNotFoundError(f"No partitions for season {season} in {MATCHES_DATASET_DIR}")
+        
+        predicate = pc.field("season_year") == season
+        if competition_codes:
+            predicate = predicate & pc.field("competition_code").isin(competition_codes)
+        label = f"{season}/{','.join(competition_codes) if competition_codes else 'all'}"
+        
+        self._create_schema(schema)
+        
+        # One season's files share the schema of the season table they were written from
+        dataset = ds.dataset(
+            season_files,
+            format="parquet",
+            partitioning=MATCHES_PARTITIONING,
+            partition_base_dir=str(MATCHES_DATASET_DIR)
+        )
+        batches = dataset.to_batches(filter=predicate, batch_size=LOAD_BATCH_SIZE)
+        rows = self._copy_to_table(
+            self._prepare_batches(batches, table_name), table_name, schema, if_exists, unlogged
+        )
+        
+        if rows == 0:
+            logger.warning("No rows found in %s for %s", MATCHES_DATASET_DIR, label)
+        else:
+            logger.info("Successfully loaded %s rows (%s) to %s.%s", rows, label, schema, table_name)
+        return rows
+    
+    def _swap_staging_table(
+        self, 
+        schema: str, 
+        staging_table: str, 
+        table_name: str, 
+        index_columns: tuple = ('id',), 
+        scope: Optional[dict] = None
+    ):
+        """Replace a table's rows with its fully loaded staging copy.
+        
+        scope ({column: values}) limits the replaced rows to those matching
+        every column; by default all rows are replaced.
+        
+        The live table is refilled rather than dropped, so dbt views selecting
+        from it keep working. Rows are replaced with DELETE, not TRUNCATE: it
+        takes no ACCESS EXCLUSIVE lock, so readers keep seeing the previous
+        load until the refill commits. The index stays in place for the same
+        reason (dropping it would lock readers out) and is only built once,
+        when the live table first gets it.
+        """
+        qualified_name = f"{schema}.{table_name}"
+        staging_name = f"{schema}.{staging_table}"
+        column_types = """
+        SELECT attname, format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = to_regclass(:name) AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+        """
+        
+        # DDL in its own short transaction, so any lock it takes on the live
+        # table is released before the refill starts
+        with self.engine.begin() as conn:
+            conn.execute(text(f"SET LOCAL maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'"))
+            # LIKE does not copy UNLOGGED: the live table is always logged
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {qualified_name} (LIKE {staging_name})"))
+            
+            staging_columns = conn.execute(text(column_types), {'name': staging_name}).fetchall()
+            live_columns = {row[0] for row in conn.execute(text(column_types), {'name': qualified_name})}
+            for column, column_type in staging_columns:
+                if column not in live_columns:
+                    logger.info("Adding column %s (%s) to %s", column, column_type, qualified_name)
+                    conn.execute(text(f'ALTER TABLE {qualified_name} ADD COLUMN "{column}" {column_type}'))
+            
+            index_name = f"{table_name}_{'_'.join(index_columns)}_idx"
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {index_name} ON {qualified_name} ({', '.join(index_columns)})"
+            ))
+        
+        column_list = ", ".join(f'"{column}"' for column, _ in staging_columns)
+        scope = scope or {}
+        where = " AND ".join(f'"{column}" = ANY(:{column})' for column in scope)
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(f"DELETE FROM {qualified_name}" + (f" WHERE {where}" if where else "")),
+                {column: list(values) for column, values in scope.items()}
+            )
+            conn.execute(text(
+                f"INSERT INTO {qualified_name} ({column_list}) SELECT {column_list} FROM {staging_name}"
+            ))
+            conn.execute(text(f"DROP TABLE {staging_name}"))
+        logger.info("Swapped %s into %s", staging_name, qualified_name)
+    
+    def load_all_matches(self, seasons: list = None, competition_codes: Optional[List[str]] = None):
+        """Load matches for multiple seasons, or only some leagues of them.
+        
+        With competition_codes, only those leagues' rows for these seasons are
+        replaced in the live table; otherwise the whole table is.
+        """
         if seasons is None:
             seasons = [2023, 2024]
         
+        schema = 'bronze'
+        table_name = 'matches'
+        staging_table = f"{table_name}_stg"
+        
         total_loaded = 0
         failed_loads = []
         
-        for season in seasons:
-            try:
-                file_name = f"all_matches_{season}.parquet"
-                rows = self.load_parquet_to_postgres(
-                    parquet_file=file_name,
-                    table_name='matches',
-                    schema='bronze',
-                    if_exists='append' if season != seasons[0] else 'replace'
-                )
-                total_loaded += rows
-                
-            except Exception as e:
-                logger.error(f"Failed to load season {season}: {e}")
-                failed_loads.append(season)
+        # Seasons are COPYed into an UNLOGGED staging table; the live table
+        # keeps serving reads throughout, the swap below included
+        self._create_schema(schema)
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{staging_table}"))
+        
+        # Season partitions are independent: COPY them concurrently, one pooled connection each
+        with ThreadPoolExecutor(max_workers=max(1, min(len(seasons), POOL_SIZE))) as executor:
+            futures = {
+                executor.submit(
+                    self.load_matches_partition,
+                    season=season,
+                    competition_codes=competition_codes,
+                    table_name=staging_table,
+                    schema=schema,
+                    if_exists='append',
+                    unlogged=True
+                ): season
+                for season in seasons
+            }
+            for future in as_completed(futures):
+                season = futures[future]
+                try:
+                    total_loaded += future.result()
+                except Exception as e:
+                    logger.error("Failed to load season %s: %s", season, e)
+                    failed_loads.append(season)
         
-        logger.info(f"Total rows loaded: {total_loaded}")
+        logger.info("Total rows loaded: %s", total_loaded)
         if failed_loads:
-            logger.warning(f"Failed to load seasons: {failed_loads}")
+            # A partial stage would drop the failed seasons from the live table
+            logger.error("Failed to load seasons: %s, keeping existing %s.%s",
+                         sorted(failed_loads), schema, table_name)
+            raise RuntimeError(f"Failed to load seasons: {sorted(failed_loads)}")
+        
+        if total_loaded > 0:
+            scope = None
+            if competition_codes:
+                scope = {'season_year': seasons, 'competition_code': competition_codes}
+            self._swap_staging_table(schema, staging_table, table_name, scope=scope)
+        else:
+            logger.warning("No rows staged, keeping existing %s.%s", schema, table_name)
         
         return total_loaded
     
-    def execute_query(self, query: str) -> pd.DataFrame:
+    @contextmanager
+    def connection(self):
+        """Check out one pooled connection to share across several queries"""
+        with self.engine.connect() as conn:
+            yield conn
+    
+    def _connection_or(self, conn=None):
+        """Use the given connection, or check out a new one"""
+        return nullcontext(conn) if conn is not None else self.engine.connect()
+    
+    def execute_query(self, query: str, conn=None) -> pd.DataFrame:
         """Execute a SQL query and return results"""
         try:
-            with self.engine.connect() as conn:
-                result = pd.read_sql(query, conn)
-            logger.info(f"Query executed successfully, returned {len(result)} rows")
+            with self._connection_or(conn) as c:
+                result = pd.read_sql(query, c)
+            logger.info("Query executed successfully, returned %s rows", len(result))
             return result
         except SQLAlchemyError as e:
-            logger.error(f"Query execution failed: {e}")
+            logger.error("Query execution failed: %s", e)
             raise
     
-    def get_table_stats(self, schema: str, table: str) -> dict:
+    def get_table_stats(self, schema: str, table: str, conn=None) -> dict:
         """Get statistics about a table"""
         try:
             query = text(f"""
@@ -212,14 +441,18 @@ class PostgreSQLLoader:
                 COUNT(DISTINCT id) as unique_ids
             FROM {schema}.{table}
             """)
-            with self.engine.connect() as conn:
-                result = conn.execute(query)
-                row = result.fetchone()
+            with self._connection_or(conn) as c:
+                try:
+                    row = c.execute(query).fetchone()
+                except SQLAlchemyError:
+                    # Keep a shared connection usable for the next query
+                    c.rollback()
+                    raise
                 stats = {'row_count': row[0], 'unique_ids': row[1]}
-            logger.info(f"Stats for {schema}.{table}: {stats}")
+            logger.info("Stats for %s.%s: %s", schema, table, stats)
             return stats
         except Exception as e:
-            logger.error(f"Failed to get stats for {schema}.{table}: {e}")
+            logger.error("Failed to get stats for %s.%s: %s", schema, table, e)
             return {}
     
     def close(self):
@@ -246,7 +479,7 @@ def main():
                 schema='bronze'
             )
         except Exception as e:
-            logger.warning(f"Competition loading failed (non-critical): {e}")
+            logger.warning("Competition loading failed (non-critical): %s", e)
         
         # Load matches
         loader.load_all_matches()
@@ -256,11 +489,11 @@ def main():
         
         logger.info("=" * 50)
         logger.info("Loading completed successfully")
-        logger.info(f"Final stats: {stats}")
+        logger.info("Final stats: %s", stats)
         logger.info("=" * 50)
         
     except Exception as e:
-        logger.error(f"Loading pipeline failed: {e}")
+        logger.error("Loading pipeline failed: %s", e)
         raise
     finally:
         loader.close()
@@ -0,0 +1,206 @@
+"""
+PostgreSQL Binary COPY Helpers
+Stream DataFrames into PostgreSQL with COPY ... FROM STDIN WITH (FORMAT BINARY),
+falling back to batched multi-row INSERTs for column types COPY cannot encode
+"""
+import io
+import struct
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+# Binary COPY framing (see PostgreSQL docs, "COPY - Binary Format")
+COPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+COPY_TRAILER = struct.pack('>h', -1)
+NULL_FIELD = struct.pack('>i', -1)
+
+# PostgreSQL stores dates and timestamps relative to 2000-01-01
+PG_EPOCH = pd.Timestamp('2000-01-01', tz='UTC')
+ONE_MICROSECOND = pd.Timedelta(microseconds=1)
+ONE_DAY = pd.Timedelta(days=1)
+
+# Fixed-width types: target type -> big-endian numpy format
+FIXED_WIDTH_TYPES = {
+    'smallint': '>i2',
+    'integer': '>i4',
+    'bigint': '>i8',
+    'real': '>f4',
+    'double precision': '>f8',
+    'boolean': '?',
+}
+TEXT_TYPES = {'text', 'character varying', 'character', 'json'}
+TIMESTAMP_TYPES = {'timestamp without time zone', 'timestamp with time zone'}
+SUPPORTED_TYPES = set(FIXED_WIDTH_TYPES) | TEXT_TYPES | TIMESTAMP_TYPES | {'date', 'jsonb'}
+
+# Rows per INSERT statement for the execute_values fallback
+INSERT_PAGE_SIZE = 10_000
+
+
+def get_column_types(cursor, schema: str, table: str) -> Dict[str, str]:
+    """Return {column_name: data_type} for an existing table"""
+    cursor.execute(
+        """
+        SELECT column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = %s
+        """,
+        (schema, table)
+    )
+    return dict(cursor.fetchall())
+
+
+def _encode_fixed(values: np.ndarray, mask: np.ndarray, fmt: str) -> List[bytes]:
+    """Encode a fixed-width column as length-prefixed big-endian fields"""
+    width = np.dtype(fmt).itemsize
+    fields = np.empty(len(values), dtype=[('len', '>i4'), ('val', fmt)])
+    fields['len'] = width
+    fields['val'] = values
+    raw = fields.tobytes()
+    step = 4 + width
+    cells = [raw[i:i + step] for i in range(0, len(raw), step)]
+    for i in np.flatnonzero(mask):
+        cells[i] = NULL_FIELD
+    return cells
+
+
+def _fixed_values(series: pd.Series, mask: np.ndarray, pg_type: str, fmt: str) -> np.ndarray:
+    """NULL-filled column values cast to fmt, refusing casts that would wrap or truncate"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Decode to the category values; 0 is not a category to fill with
+        series = pd.Series(np.asarray(series), index=series.index, name=series.name)
+    filler = False if pg_type == 'boolean' else 0
+    values = series.where(~mask, filler).to_numpy()
+    if values.dtype == object:
+        # Nullable extension dtypes come back as objects
+        values = np.array(values.tolist())
+    
+    target = np.dtype(fmt)
+    if target.kind == 'i' and len(values):
+        if values.dtype.kind == 'f' and not np.array_equal(values, np.trunc(values)):
+            raise ValueError(f"Column {series.name!r} has non-integer values for {pg_type}")
+        info = np.iinfo(target)
+        if values.min() < info.min or values.max() > info.max:
+            raise ValueError(
+                f"Column {series.name!r} has values outside the {pg_type} range "
+                f"[{info.min}, {info.max}]"
+            )
+    elif target.kind == 'f' and values.dtype.kind in 'iuf' and len(values):
+        finite = values[np.isfinite(values)]
+        if len(finite) and np.abs(finite).max() > np.finfo(target).max:
+            raise ValueError(f"Column {series.name!r} has values outside the {pg_type} range")
+    return values.astype(fmt)
+
+
+def _encode_text(series: pd.Series, mask: np.ndarray, prefix: bytes = b'') -> List[bytes]:
+    """Encode a text-like column as length-prefixed UTF-8 fields"""
+    cells = []
+    for value, is_null in zip(series.tolist(), mask):
+        if is_null:
+            cells.append(NULL_FIELD)
+        else:
+            payload = prefix + str(value).encode('utf-8')
+            cells.append(struct.pack('>i', len(payload)) + payload)
+    return cells
+
+
+def _encode_column(series: pd.Series, pg_type: str) -> List[bytes]:
+    """Encode one DataFrame column for the given PostgreSQL target type"""
+    mask = series.isna().to_numpy()
+
+    if pg_type in FIXED_WIDTH_TYPES:
+        fmt = FIXED_WIDTH_TYPES[pg_type]
+        return _encode_fixed(_fixed_values(series, mask, pg_type, fmt), mask, fmt)
+
+    if pg_type in TIMESTAMP_TYPES:
+        # Naive values are taken as UTC wall-clock time
+        micros = (pd.to_datetime(series, utc=True) - PG_EPOCH) // ONE_MICROSECOND
+        return _encode_fixed(micros.fillna(0).to_numpy().astype('>i8'), mask, '>i8')
+
+    if pg_type == 'date':
+        days = (pd.to_datetime(series, utc=True).dt.normalize() - PG_EPOCH) // ONE_DAY
+        return _encode_fixed(days.fillna(0).to_numpy().astype('>i4'), mask, '>i4')
+
+    if pg_type in TEXT_TYPES:
+        return _encode_text(series, mask)
+
+    if pg_type == 'jsonb':
+        # jsonb binary input is a version byte followed by the JSON text
+        return _encode_text(series, mask, prefix=b'\x01')
+
+    raise TypeError(f"Unsupported column type for binary COPY: {pg_type}")
+
+
+def encode_binary_copy(df: pd.DataFrame, pg_types: List[str]) -> io.BytesIO:
+    """Encode a DataFrame into a binary COPY payload"""
+    columns = [_encode_column(df[col], pg_type) for col, pg_type in zip(df.columns, pg_types)]
+    field_count = struct.pack('>h', len(columns))
+
+    buffer = io.BytesIO()
+    buffer.write(COPY_HEADER)
+    buffer.writelines(field_count + b''.join(row) for row in zip(*columns))
+    buffer.write(COPY_TRAILER)
+    buffer.seek(0)
+    return buffer
+
+
+def _column_list(df: pd.DataFrame) -> sql.Composable:
+    """Quoted, comma-separated column list for the DataFrame"""
+    return sql.SQL(', ').join(sql.Identifier(col) for col in df.columns)
+
+
+def copy_dataframe(cursor, df: pd.DataFrame, schema: str, table: str, pg_types: List[str]) -> int:
+    """Load a DataFrame into schema.table with binary COPY"""
+    payload = encode_binary_copy(df, pg_types)
+    statement = sql.SQL("COPY {}.{} ({}) FROM STDIN WITH (FORMAT BINARY)").format(
+        sql.Identifier(schema),
+        sql.Identifier(table),
+        _column_list(df)
+    )
+    cursor.copy_expert(statement.as_string(cursor), payload)
+    return len(df)
+
+
+def insert_dataframe(cursor, df: pd.DataFrame, schema: str, table: str,
+                     page_size: int = INSERT_PAGE_SIZE) -> int:
+    """Load a DataFrame into schema.table with batched multi-row INSERTs"""
+    statement = sql.SQL("INSERT INTO {}.{} ({}) VALUES %s").format(
+        sql.Identifier(schema),
+        sql.Identifier(table),
+        _column_list(df)
+    )
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    execute_values(cursor, statement.as_string(cursor), rows, page_size=page_size)
+    return len(df)
+
+
+def load_dataframe(cursor, df: pd.DataFrame, schema: str, table: str) -> int:
+    """
+    Load a DataFrame into an existing table
+
+    Uses binary COPY when every target column type is supported, otherwise
+    falls back to execute_values. Runs with synchronous_commit off for the
+    rest of the current transaction.
+
+    Args:
+        cursor: psycopg2 cursor
+        df (pd.DataFrame): Data to load, columns must exist in the table
+        schema (str): Target schema
+        table (str): Target table
+
+    Returns:
+        int: Number of rows loaded
+    """
+    column_types = get_column_types(cursor, schema, table)
+    missing = [col for col in df.columns if col not in column_types]
+    if missing:
+        raise ValueError(f"Columns not found in {schema}.{table}: {missing}")
+
+    cursor.execute("SET LOCAL synchronous_commit = off")
+
+    pg_types = [column_types[col] for col in df.columns]
+    if all(pg_type in SUPPORTED_TYPES for pg_type in pg_types):
+        return copy_dataframe(cursor, df, schema, table, pg_types)
+    return insert_dataframe(cursor, df, schema, table)
@@ -1,15 +1,8 @@
-from sqlalchemy import create_engine, text
-from dotenv import load_dotenv
-import os
-from urllib.parse import quote_plus
-
-load_dotenv()
-
-db_pass = quote_plus(os.environ['DB_PASS'])
-db_url = f"postgresql+psycopg2://{os.environ['DB_USER']}:{db_pass}@{os.environ['DB_HOST']}:{os.environ['DB_PORT']}/{os.environ['DB_NAME']}"
+from sqlalchemy import text
+from db import get_engine
 
 try:
-    engine = create_engine(db_url, pool_pre_ping=True)
+    engine = get_engine()
     with engine.connect() as conn:
         result = conn.execute(text("SELECT version()"))
         version = result.fetchone()[0]
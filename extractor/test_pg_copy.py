@@ -0,0 +1,133 @@
+"""
+Round-trip tests for the binary COPY encoder in pg_copy
+Payloads are decoded here, no database connection is needed
+"""
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pg_copy import COPY_HEADER, COPY_TRAILER, PG_EPOCH, encode_binary_copy
+
+
+def decode_binary_copy(payload: bytes) -> list:
+    """Split a binary COPY payload into rows of raw fields (None for NULL)"""
+    assert payload.startswith(COPY_HEADER)
+    assert payload.endswith(COPY_TRAILER)
+    body = payload[len(COPY_HEADER):-len(COPY_TRAILER)]
+    rows, offset = [], 0
+    while offset < len(body):
+        (field_count,) = struct.unpack_from('>h', body, offset)
+        offset += 2
+        row = []
+        for _ in range(field_count):
+            (length,) = struct.unpack_from('>i', body, offset)
+            offset += 4
+            if length == -1:
+                row.append(None)
+            else:
+                row.append(body[offset:offset + length])
+                offset += length
+        rows.append(row)
+    return rows
+
+
+def round_trip(df: pd.DataFrame, pg_types: list) -> list:
+    return decode_binary_copy(encode_binary_copy(df, pg_types).getvalue())
+
+
+def column(rows: list, index: int, fmt: str = None) -> list:
+    """One decoded column, unpacked with the struct format when given"""
+    cells = [row[index] for row in rows]
+    if fmt is None:
+        return cells
+    return [None if cell is None else struct.unpack(fmt, cell)[0] for cell in cells]
+
+
+def test_fixed_width_values_and_nulls():
+    df = pd.DataFrame({
+        'small': pd.Series([1, None, -3], dtype='Int64'),
+        'big': [2**40, 0, -1],
+        'ratio': [0.5, np.nan, 2.25],
+        'flag': pd.Series([True, None, False], dtype='boolean'),
+    })
+    rows = round_trip(df, ['smallint', 'bigint', 'double precision', 'boolean'])
+
+    assert column(rows, 0, '>h') == [1, None, -3]
+    assert column(rows, 1, '>q') == [2**40, 0, -1]
+    assert column(rows, 2, '>d') == [0.5, None, 2.25]
+    assert column(rows, 3, '?') == [True, None, False]
+
+
+def test_integral_floats_encode_as_integers():
+    # Integer columns with NULLs arrive from Parquet as float64
+    df = pd.DataFrame({'score': [2.0, np.nan, 0.0]})
+    rows = round_trip(df, ['integer'])
+
+    assert column(rows, 0, '>i') == [2, None, 0]
+
+
+@pytest.mark.parametrize('values, pg_type', [
+    ([1, 40_000], 'smallint'),
+    ([-(2**31) - 1], 'integer'),
+    ([float('inf')], 'bigint'),
+    ([1e39], 'real'),
+])
+def test_out_of_range_values_are_rejected(values, pg_type):
+    with pytest.raises(ValueError, match='range'):
+        encode_binary_copy(pd.DataFrame({'value': values}), [pg_type])
+
+
+def test_non_integer_floats_are_rejected():
+    with pytest.raises(ValueError, match='non-integer'):
+        encode_binary_copy(pd.DataFrame({'value': [1.0, 2.5]}), ['integer'])
+
+
+def test_timestamps_tz_aware_and_naive():
+    aware = pd.Series(pd.to_datetime(['2024-05-01 12:00:00+02:00', None], utc=True))
+    naive = pd.Series(pd.to_datetime(['2024-05-01 10:00:00', None]))
+    rows = round_trip(pd.DataFrame({'aware': aware, 'naive': naive}), [
+        'timestamp with time zone', 'timestamp without time zone'
+    ])
+
+    expected = (pd.Timestamp('2024-05-01 10:00:00', tz='UTC') - PG_EPOCH) // pd.Timedelta(microseconds=1)
+    assert column(rows, 0, '>q') == [expected, None]
+    # Naive values are taken as UTC wall-clock time
+    assert column(rows, 1, '>q') == [expected, None]
+
+
+def test_dates():
+    df = pd.DataFrame({'day': pd.to_datetime(['2000-01-02', None, '1999-12-31'])})
+    rows = round_trip(df, ['date'])
+
+    assert column(rows, 0, '>i') == [1, None, -1]
+
+
+def test_text_and_jsonb():
+    df = pd.DataFrame({
+        'name': ['Arsenal', None, 'Olympique de Marseille ⚽'],
+        'payload': ['{"home": 2}', None, '[]'],
+    })
+    rows = round_trip(df, ['text', 'jsonb'])
+
+    assert column(rows, 0) == [b'Arsenal', None, 'Olympique de Marseille ⚽'.encode('utf-8')]
+    # jsonb binary input: version byte 1, then the JSON text
+    assert column(rows, 1) == [b'\x01{"home": 2}', None, b'\x01[]']
+
+
+def test_categoricals():
+    df = pd.DataFrame({
+        'status': pd.Categorical(['FINISHED', None, 'SCHEDULED']),
+        'matchday': pd.Categorical([38, None, 1]),
+    })
+    rows = round_trip(df, ['character varying', 'smallint'])
+
+    assert column(rows, 0) == [b'FINISHED', None, b'SCHEDULED']
+    assert column(rows, 1, '>h') == [38, None, 1]
+
+
+def test_empty_frame():
+    rows = round_trip(pd.DataFrame({'id': pd.Series([], dtype='int64')}), ['bigint'])
+
+    assert rows == []
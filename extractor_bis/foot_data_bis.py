@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 load_dotenv()
 import os 
+import atexit
 import pandas as pd
 import httpx
 from pathlib import Path
@@ -20,6 +21,15 @@ RAW_DIR.mkdir(parents=True, exist_ok= True)
 # HEADERS POUR L'API
 HEADERS = {"X-Auth-Token": os.environ["FOOTBALL_API_TOKEN"]}
 
+# client HTTP partagé : une seule connexion TCP/TLS pour toutes les requêtes
+_CLIENT = httpx.Client(
+    timeout=60,
+    headers=HEADERS,
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=5)
+)
+atexit.register(_CLIENT.close)
+
 def _save_json(data, file_path)-> Path:
     """SAVE DATA AS JSON FILE"""
     path = RAW_DIR / file_path
@@ -30,10 +40,9 @@ def fetch_competitions():
     """FETCH COMPETITONS FROM THE API"""
     url = f"{API_BASE}/competitions"
     try: 
-        with httpx.Client(timeout=60) as client :
-            response = client.get(url, headers = HEADERS)
-            response.raise_for_status()
-            data = response.json()
+        response = _CLIENT.get(url)
+        response.raise_for_status()
+        data = response.json()
         # Normalisation minimale
         if "competitions" in data:
             comp = pd.json_normalize(data["competitions"])
@@ -50,30 +59,37 @@ def fetch_matches_save(season: int = 2024, leagues : list = None):
     saved =[]
     frames = []
     try:
-        with httpx.Client(timeout=60) as client:
-            for code in leagues:
-                print(f"récupération des matches pour {code}...")
-                url = f"{API_BASE}/competitions/{code}/matches?season={season}"
-                response = client.get(url, headers=HEADERS)
-                response.raise_for_status()
-                data= response.json()
-                
-                # sauvegarde du JSON brut
-                saved.append(_save_json(data, f"matches_{code}_{season}.json"))
-                # normalisation minimale
-                matches = pd.json_normalize(data.get("matches", []))
-                if not matches.empty:
-                    matches["competitions"]= code
-                    frames.append(matches)
-                    print(f"{len(matches)} matches pour {code} récupérés.")
-                else:
-                    print(f"Aucun match trouvé pour {code}.")
-            if frames:
-                df = pd.concat(frames, ignore_index = True)
-                df.to_parquet(LANDING_DIR / f"matches_{season}.parquet", index =False)
-                print(f"Total de {len(df)} matches sauvegardés pour la saison {season}.")
+        for code in leagues:
+            print(f"récupération des matches pour {code}...")
+            url = f"{API_BASE}/competitions/{code}/matches?season={season}"
+            response = _CLIENT.get(url)
+            response.raise_for_status()
+            data= response.json()
+            
+            # sauvegarde du JSON brut
+            saved.append(_save_json(data, f"matches_{code}_{season}.json"))
+            # normalisation minimale
+            matches = pd.json_normalize(data.get("matches", []))
+            if not matches.empty:
+                matches["competitions"]= code
+                frames.append(matches)
+                print(f"{len(matches)} matches pour {code} récupérés.")
             else:
-                print("Aucun match récupéré pour les ligues spécifiées.")
+                print(f"Aucun match trouvé pour {code}.")
+        if frames:
+            df = pd.concat(frames, ignore_index = True)
+            df.to_parquet(
+                LANDING_DIR / f"matches_{season}.parquet",
+                index =False,
+                engine="pyarrow",
+                compression="zstd",
+                compression_level=3,
+                row_group_size=500_000,
+                use_dictionary=True
+            )
+            print(f"Total de {len(df)} matches sauvegardés pour la saison {season}.")
+        else:
+            print("Aucun match récupéré pour les ligues spécifiées.")
     except httpx.HTTPError as e:
         print(f"Erreur lors de la récupération des matches: {e}")
         raise
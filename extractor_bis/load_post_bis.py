@@ -1,31 +1,51 @@
 import pandas as pd
-from sqlalchemy import create_engine
 import os
 from dotenv import load_dotenv
 import numpy as np
-import json
+import orjson
+import sys
+from pathlib import Path
+
+# encodeur COPY binaire et engine partagés avec extractor/
+sys.path.append(str(Path(__file__).resolve().parents[1] / "extractor"))
+from pg_copy import load_dataframe
+from db import get_engine
 
 load_dotenv()
 
 # connexion au BD 
-engine = create_engine(f"postgresql+psycopg2://{os.environ['DB_USER']}:{os.environ['DB_PASS']}@{os.environ['DB_HOST']}:{os.environ['DB_PORT']}/{os.environ['DB_NAME']}")
+engine = get_engine()
 landing_dir = os.getenv("DATA_DIR")+"/landing"
 
+JSON_TYPES = (np.ndarray, list, dict)
+
+def _json_default(x):
+    return x.tolist() if isinstance(x, np.ndarray) else str(x)
+
+def save_json(x):
+    if isinstance(x, np.ndarray):
+        if x.size ==0 or pd.isna(x).all():
+            return None
+        x = x.tolist()
+    return orjson.dumps(x, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode()
+
 def clean_data(df: pd.DataFrame)-> pd.DataFrame:
-    for col in df.columns:
-        if df[col].dtype =='object':
-            def save_json(x):
-                if not isinstance(x, (np.ndarray, list, dict)) and pd.isna(x): 
-                    return None
-                if isinstance(x, np.ndarray):
-                    if x.size ==0 or (x.size > 0 and pd.isna(x).all()):
-                        return None
-                    return json.dumps(x.tolist(), default=str)
-                if isinstance(x, (list,dict)):
-                    return json.dumps(x, default=str)
-                return str(x)
-            df[col] = df[col].apply(save_json)
+    for col in df.select_dtypes(include='object').columns:
+        values = df[col]
+        # conteneurs -> JSON, scalaires -> str, valeurs manquantes -> None
+        is_container = values.map(type).isin(JSON_TYPES)
+        is_scalar = ~is_container & values.notna()
+        cleaned = pd.Series(None, index=df.index, dtype=object)
+        cleaned[is_scalar] = values[is_scalar].astype(str)
+        cleaned[is_container] = [save_json(x) for x in values[is_container]]
+        df[col] = cleaned
     return df 
+def copy_from_df(df: pd.DataFrame, table_name: str):
+    """Crée la table via to_sql (DDL seulement) puis charge les lignes avec COPY binaire"""
+    with engine.begin() as conn:
+        df.head(0).to_sql(table_name, conn, if_exists="replace", index=False)
+        with conn.connection.cursor() as cursor:
+            load_dataframe(cursor, df, "public", table_name)
 def load_parquet_to_postgres():
     for file in os.listdir(landing_dir):
         if file.endswith(".parquet"):
@@ -34,7 +54,7 @@ def load_parquet_to_postgres():
             print(f"loading {file_path} to table {table_name}")
             df = pd.read_parquet(file_path)
             df = clean_data(df)
-            df.to_sql(table_name, engine, if_exists="replace", index=False)
+            copy_from_df(df, table_name)
     print("Data loaded to Postgres successfully.")
 if __name__ == "__main__":
     load_parquet_to_postgres()
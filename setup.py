@@ -2,64 +2,148 @@
 """
 Setup Script for Football ELT Pipeline
 Automated setup and validation
+
+Usage:
+    python setup.py [--install] [--force] [--check-only=structure]
+    python setup.py --compile-lock
+
+--check-only=structure validates Python, .env and directories only, without
+probing Docker/PostgreSQL or touching ~/.dbt. Recommended for container-layer
+validation where Docker and PostgreSQL are provided externally.
+
+--compile-lock pins requirement.txt with hashes into requirements.lock
+(needs pip-tools); --install then installs from the lock file when present.
 """
 import os
 import sys
+import json
+import hashlib
+import shutil
 from pathlib import Path
-import subprocess
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+# Values accepted by --check-only=
+CHECK_ONLY_MODES = ('structure',)
+
+# Interpreter check, fixed for the life of the process
+PY_OK = sys.version_info >= (3, 9)
+PY_STR = f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
+
+# Emoji need a UTF-8 console; others (e.g. Windows cp1252) get ASCII markers
+UTF8_STDOUT = (getattr(sys.stdout, 'encoding', None) or '').lower().startswith('utf')
+if UTF8_STDOUT:
+    SYMBOLS = {'ok': "✅", 'fail': "❌", 'info': "ℹ️ ", 'warn': "⚠️ ", 'done': "🎉", 'rocket': "🚀 "}
+else:
+    SYMBOLS = {'ok': "[OK]", 'fail': "[FAIL]", 'info': "[INFO]", 'warn': "[WARN]", 'done': "[DONE]", 'rocket': "== "}
+    # Anything else non-encodable is replaced instead of raising
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(errors='replace')
+
+_BANNER = SYMBOLS['rocket'] * 15
+
+# Template written to ~/.dbt/profiles.yml when it doesn't exist yet
+EXPECTED_PROFILES = """
+stat_foot:
+  outputs:
+    dev:
+      type: postgres
+      host: localhost
+      port: 5432
+      user: football_user
+      password: your_password_here  # CHANGE THIS
+      dbname: football_stats_db
+      schema: gold
+      threads: 4
+  target: dev
+"""
 
 
 class SetupManager:
     """Manage project setup"""
     
-    def __init__(self):
-        self.project_root = Path(__file__).parent
-        self.checks_passed = []
-        self.checks_failed = []
+    def __init__(self, mode=None):
+        # mode='structure': skip the Docker/PostgreSQL probes and dbt profiles
+        self.mode = mode
+        self.project_root = Path(__file__).resolve().parent
+        # Plain string for os.path joins in loops, Path stays the public attribute
+        self.root_str = str(self.project_root)
+        self.cache_dir = self.project_root / '.setup_cache'
+        self.requirements_file = self.project_root / 'requirement.txt'
+        self.lock_file = self.project_root / 'requirements.lock'
+        self.dbt_profiles_file = Path.home() / '.dbt' / 'profiles.yml'
+        # One marker per mode: a structure-only pass doesn't prove the full setup
+        marker_name = '.setup_complete' if mode is None else f'.setup_complete.{mode}'
+        self.setup_marker = self.project_root / marker_name
+        self._root_entries = None
+        # Console lines buffered here and written in one go by flush_output
+        self._output = []
+        # Successes are already printed, only their count is kept for the summary
+        self.n_passed = 0
+        self.failed_log = []
+    
+    def root_entries(self):
+        """{name: is_dir} for the project root, from a single scandir per run"""
+        if self._root_entries is None:
+            with os.scandir(self.root_str) as entries:
+                self._root_entries = {entry.name: entry.is_dir() for entry in entries}
+        return self._root_entries
+    
+    def root_has_file(self, name):
+        """Whether the project root contained the file `name` when first scanned"""
+        return self.root_entries().get(name) is False
+    
+    def emit(self, text=""):
+        """Buffer one line of output"""
+        self._output.append(f"{text}\n")
+    
+    def flush_output(self):
+        """Write buffered output with a single write call"""
+        if self._output:
+            sys.stdout.write("".join(self._output))
+            sys.stdout.flush()
+            self._output.clear()
     
     def print_header(self, text):
         """Print formatted header"""
-        print("\n" + "=" * 60)
-        print(f"  {text}")
-        print("=" * 60)
+        self.emit("\n" + "=" * 60)
+        self.emit(f"  {text}")
+        self.emit("=" * 60)
     
     def print_success(self, text):
         """Print success message"""
-        print(f"✅ {text}")
-        self.checks_passed.append(text)
+        self.emit(f"{SYMBOLS['ok']} {text}")
+        self.n_passed += 1
     
     def print_error(self, text):
         """Print error message"""
-        print(f"❌ {text}")
-        self.checks_failed.append(text)
+        self.emit(f"{SYMBOLS['fail']} {text}")
+        self.failed_log.append(text)
     
     def print_info(self, text):
         """Print info message"""
-        print(f"ℹ️  {text}")
+        self.emit(f"{SYMBOLS['info']} {text}")
     
     def check_python_version(self):
         """Check Python version"""
         self.print_header("Checking Python Version")
         
-        version = sys.version_info
-        if version.major >= 3 and version.minor >= 9:
-            self.print_success(f"Python {version.major}.{version.minor}.{version.micro}")
+        if PY_OK:
+            self.print_success(f"Python {PY_STR}")
             return True
         else:
-            self.print_error(f"Python 3.9+ required, found {version.major}.{version.minor}")
+            self.print_error(f"Python 3.9+ required, found {PY_STR}")
             return False
     
     def check_env_file(self):
         """Check if .env file exists"""
         self.print_header("Checking Environment Configuration")
         
-        env_file = self.project_root / '.env'
-        env_example = self.project_root / '.env.example'
-        
-        if env_file.exists():
+        if self.root_has_file('.env'):
             self.print_success(".env file found")
             return True
-        elif env_example.exists():
+        elif self.root_has_file('.env.example'):
             self.print_error(".env file not found")
             self.print_info("Run: cp .env.example .env")
             self.print_info("Then edit .env with your credentials")
@@ -68,6 +152,14 @@ class SetupManager:
             self.print_error("Neither .env nor .env.example found")
             return False
     
+    def _safe_subpath(self, rel):
+        """Absolute path of rel inside the project root, ValueError if it escapes it"""
+        # Lexical check: '..' can't climb out, a symlinked data/ dir is still allowed
+        full_path = os.path.normpath(os.path.join(self.root_str, rel))
+        if os.path.commonpath([full_path, self.root_str]) != self.root_str:
+            raise ValueError(f"Directory outside the project: {rel}")
+        return full_path
+    
     def check_directories(self):
         """Check and create required directories"""
         self.print_header("Checking Directory Structure")
@@ -81,114 +173,217 @@ class SetupManager:
             'config'
         ]
         
-        for dir_path in required_dirs:
-            full_path = self.project_root / dir_path
-            if not full_path.exists():
-                full_path.mkdir(parents=True, exist_ok=True)
+        # One scandir per distinct parent instead of a stat per directory
+        full_paths = [self._safe_subpath(dir_path) for dir_path in required_dirs]
+        splits = [os.path.split(full_path) for full_path in full_paths]
+        existing = {}
+        for parent in {parent for parent, _ in splits}:
+            if parent == self.root_str:
+                root_dirs = {name for name, is_dir in self.root_entries().items() if is_dir}
+                existing[parent] = root_dirs
+                continue
+            try:
+                with os.scandir(parent) as entries:
+                    existing[parent] = {entry.name for entry in entries if entry.is_dir()}
+            except FileNotFoundError:
+                existing[parent] = set()
+        
+        missing = [
+            full_path for full_path, (parent, name) in zip(full_paths, splits)
+            if name not in existing[parent]
+        ]
+        if missing:
+            # Independent mkdirs, each releases the GIL: pay for one slow syscall, not six
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                list(executor.map(lambda path: os.makedirs(path, exist_ok=True), missing))
+        
+        for dir_path, full_path in zip(required_dirs, full_paths):
+            if full_path in missing:
                 self.print_info(f"Created: {dir_path}")
             else:
                 self.print_success(f"Exists: {dir_path}")
         
         return True
     
-    def check_docker(self):
-        """Check if Docker is available"""
-        self.print_header("Checking Docker")
+    def probe_version(self, command):
+        """Return `command --version` output, or None if the tool is missing"""
+        # Imported on first use: structure-only and cached runs never spawn a process
+        import subprocess
         
+        # PATH lookup first: no fork/exec at all when the tool isn't installed
+        executable = shutil.which(command)
+        if executable is None:
+            return None
         try:
-            result = subprocess.run(
-                ['docker', '--version'],
-                capture_output=True,
-                text=True
+            output = subprocess.check_output(
+                [executable, '--version'],
+                stdin=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                timeout=2
             )
-            if result.returncode == 0:
-                self.print_success(f"Docker installed: {result.stdout.strip()}")
-                return True
-        except FileNotFoundError:
-            pass
+        except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            return None
+        return output.strip()
+    
+    def check_docker(self, probe: Optional[Future] = None):
+        """Check if Docker is available"""
+        self.print_header("Checking Docker")
+        
+        version = probe.result() if probe else self.probe_version('docker')
+        if version:
+            self.print_success(f"Docker installed: {version}")
+            return True
         
         self.print_error("Docker not found")
         self.print_info("Install from: https://www.docker.com/products/docker-desktop")
         return False
     
-    def check_postgres(self):
+    def check_postgres(self, probe: Optional[Future] = None):
         """Check if PostgreSQL is available"""
         self.print_header("Checking PostgreSQL")
         
-        try:
-            result = subprocess.run(
-                ['psql', '--version'],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode == 0:
-                self.print_success(f"PostgreSQL installed: {result.stdout.strip()}")
-                return True
-        except FileNotFoundError:
-            pass
+        version = probe.result() if probe else self.probe_version('psql')
+        if version:
+            self.print_success(f"PostgreSQL installed: {version}")
+            return True
         
         self.print_error("PostgreSQL client not found")
         self.print_info("Install from: https://www.postgresql.org/download/")
         return False
     
+    def installed_packages_hash(self):
+        """Hash of the packages installed in the current interpreter"""
+        import subprocess
+        
+        result = subprocess.run(
+            [sys.executable, '-m', 'pip', '--disable-pip-version-check', 'list', '--format=freeze'],
+            capture_output=True,
+            text=True
+        )
+        return hashlib.sha256(result.stdout.encode('utf-8')).hexdigest()
+    
     def install_dependencies(self):
         """Install Python dependencies"""
+        import subprocess
+        
         self.print_header("Installing Python Dependencies")
         
-        requirements_file = self.project_root / 'requirement.txt'
+        requirements_file = self.requirements_file
         
-        if not requirements_file.exists():
+        if not self.root_has_file(requirements_file.name):
             self.print_error("requirement.txt not found")
             return False
         
+        # Fully pinned, hashed lock file: pip verifies hashes and skips resolution
+        if self.root_has_file(self.lock_file.name):
+            requirements_file = self.lock_file
+            lock_options = ['--require-hashes', '--no-deps']
+            self.print_info(f"Installing from {self.lock_file.name}")
+        else:
+            lock_options = []
+        
+        # Skip pip when neither the requirements nor the installed packages changed
+        # since the last successful install
+        marker = self.cache_dir / 'requirements.sha256'
+        requirements_hash = hashlib.sha256(requirements_file.read_bytes()).hexdigest()
+        if marker.exists():
+            cached_requirements, _, cached_packages = marker.read_text().partition('\n')
+            if cached_requirements == requirements_hash and cached_packages == self.installed_packages_hash():
+                self.print_success("Dependencies up to date (cached)")
+                return True
+        
         self.print_info("Installing dependencies... (this may take a few minutes)")
+        # pip writes to the terminal itself, buffered lines must come out first
+        self.flush_output()
+        
+        log_dir = os.path.join(self.root_str, 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+        log_path = os.path.join(log_dir, 'pip-install.log')
         
         try:
-            result = subprocess.run(
-                [sys.executable, '-m', 'pip', 'install', '-r', str(requirements_file)],
-                capture_output=True,
-                text=True
-            )
+            # pip output is streamed line by line to the terminal and the log
+            # file, never accumulated in memory
+            with open(log_path, 'w', encoding='utf-8') as log_file:
+                process = subprocess.Popen(
+                    [
+                        sys.executable, '-m', 'pip', '--disable-pip-version-check', 'install',
+                        '--no-input',
+                        '--cache-dir', str(Path.home() / '.cache' / 'pip'),
+                        '--prefer-binary',
+                        *lock_options,
+                        '-r', str(requirements_file)
+                    ],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    errors='replace'
+                )
+                with process:
+                    for line in process.stdout:
+                        sys.stdout.write(line)
+                        log_file.write(line)
             
-            if result.returncode == 0:
+            if process.returncode == 0:
+                self.cache_dir.mkdir(exist_ok=True)
+                marker.write_text(f"{requirements_hash}\n{self.installed_packages_hash()}")
                 self.print_success("Dependencies installed")
                 return True
             else:
-                self.print_error(f"Installation failed: {result.stderr}")
+                self.print_error(
+                    f"Installation failed (pip exited with code {process.returncode}); see logs/pip-install.log"
+                )
                 return False
         except Exception as e:
             self.print_error(f"Installation error: {e}")
             return False
     
+    def compile_lock(self):
+        """Pin requirement.txt with hashes into requirements.lock using pip-tools"""
+        import subprocess
+        
+        self.print_header("Compiling requirements.lock")
+        self.flush_output()
+        
+        result = subprocess.run(
+            [
+                sys.executable, '-m', 'piptools', 'compile',
+                '--generate-hashes',
+                '--quiet',
+                '-o', str(self.lock_file),
+                str(self.requirements_file)
+            ],
+            check=False
+        )
+        if result.returncode == 0:
+            self.print_success(f"Created {self.lock_file.name}")
+            return True
+        self.print_error("pip-compile failed")
+        self.print_info("Install pip-tools with: pip install pip-tools")
+        return False
+    
     def create_dbt_profiles(self):
         """Create DBT profiles file"""
         self.print_header("Checking DBT Configuration")
         
-        dbt_dir = Path.home() / '.dbt'
-        profiles_file = dbt_dir / 'profiles.yml'
+        profiles_file = self.dbt_profiles_file
+        dbt_dir = profiles_file.parent
         
         if profiles_file.exists():
+            # Never overwrite: the file holds the user's credentials (and maybe other profiles)
             self.print_success("DBT profiles.yml exists")
+            if profiles_file.read_bytes() == EXPECTED_PROFILES.encode('utf-8'):
+                self.print_info(f"Still the template, set your password in: {profiles_file}")
             return True
         
         dbt_dir.mkdir(exist_ok=True)
         
-        profiles_content = """
-stat_foot:
-  outputs:
-    dev:
-      type: postgres
-      host: localhost
-      port: 5432
-      user: football_user
-      password: your_password_here  # CHANGE THIS
-      dbname: football_stats_db
-      schema: gold
-      threads: 4
-  target: dev
-"""
-        
-        profiles_file.write_text(profiles_content)
+        # Atomic write: an interrupted run can't leave a truncated profiles.yml
+        with tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', newline='\n', dir=dbt_dir, delete=False
+        ) as tmp_file:
+            tmp_file.write(EXPECTED_PROFILES)
+        os.replace(tmp_file.name, profiles_file)
         self.print_success("Created DBT profiles.yml")
         self.print_info(f"Edit: {profiles_file}")
         return True
@@ -197,37 +392,84 @@ stat_foot:
         """Print setup summary"""
         self.print_header("Setup Summary")
         
-        print(f"\n✅ Passed: {len(self.checks_passed)}")
-        print(f"❌ Failed: {len(self.checks_failed)}")
-        
-        if self.checks_failed:
-            print("\nActions required:")
-            for check in self.checks_failed:
-                print(f"  - {check}")
-        
-        if not self.checks_failed:
-            print("\n🎉 Setup completed successfully!")
-            print("\nNext steps:")
-            print("  1. Edit .env with your credentials")
-            print("  2. Setup PostgreSQL database: make setup-db")
-            print("  3. Start Airflow: make start-airflow")
-            print("  4. Run extraction: make run-extraction")
-            print("  5. Run DBT: make run-dbt")
-            print("  6. Launch dashboard: make run-dashboard")
+        self.emit(f"\n{SYMBOLS['ok']} Passed: {self.n_passed}")
+        self.emit(f"{SYMBOLS['fail']} Failed: {len(self.failed_log)}")
+        
+        if self.failed_log:
+            self.emit("\nActions required:")
+            for check in self.failed_log:
+                self.emit(f"  - {check}")
+        
+        if not self.failed_log:
+            self.emit(f"\n{SYMBOLS['done']} Setup completed successfully!")
+            self.emit("\nNext steps:")
+            self.emit("  1. Edit .env with your credentials")
+            self.emit("  2. Setup PostgreSQL database: make setup-db")
+            self.emit("  3. Start Airflow: make start-airflow")
+            self.emit("  4. Run extraction: make run-extraction")
+            self.emit("  5. Run DBT: make run-dbt")
+            self.emit("  6. Launch dashboard: make run-dashboard")
         else:
-            print("\n⚠️  Please fix the issues above before proceeding")
+            self.emit(f"\n{SYMBOLS['warn']} Please fix the issues above before proceeding")
     
-    def run(self, install_deps=False):
+    def setup_fingerprint(self):
+        """Inputs a completed setup depends on, stored in the mode's marker file"""
+        requirements_file = self.requirements_file
+        profiles_file = self.dbt_profiles_file
+        return {
+            'mode': self.mode,
+            'python_version': sys.version,
+            'requirements_sha256': (
+                hashlib.sha256(requirements_file.read_bytes()).hexdigest()
+                if requirements_file.exists() else None
+            ),
+            'dbt_profiles_mtime': profiles_file.stat().st_mtime if profiles_file.exists() else None,
+        }
+    
+    def is_setup_complete(self):
+        """Whether a previous run succeeded with the same fingerprint"""
+        if not self.root_has_file(self.setup_marker.name):
+            return False
+        try:
+            return json.loads(self.setup_marker.read_text()) == self.setup_fingerprint()
+        except ValueError:
+            return False
+    
+    def run(self, install_deps=False, force=False):
         """Run complete setup"""
-        print("\n" + "🚀 " * 15)
-        print("  Football ELT Pipeline - Setup Script")
-        print("🚀 " * 15)
+        try:
+            self._run(install_deps=install_deps, force=force)
+        finally:
+            # Single write at the end (or on error) instead of one per line
+            self.flush_output()
+    
+    def _run(self, install_deps, force):
+        """Setup steps, output buffered until run() flushes it"""
+        self.emit("\n" + _BANNER)
+        self.emit("  Football ELT Pipeline - Setup Script")
+        self.emit(_BANNER)
         
-        self.check_python_version()
-        self.check_env_file()
-        self.check_directories()
-        self.check_docker()
-        self.check_postgres()
+        # --install always runs: the marker says nothing about installed packages
+        if not force and not install_deps and self.is_setup_complete():
+            self.print_info("Already configured; pass --force to re-run")
+            return
+        
+        if self.mode == 'structure':
+            self.check_python_version()
+            self.check_env_file()
+            self.check_directories()
+        else:
+            # Version probes spawn subprocesses: start them first, they run while
+            # the local checks print, results are reported in the usual order
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                docker_probe = executor.submit(self.probe_version, 'docker')
+                postgres_probe = executor.submit(self.probe_version, 'psql')
+                
+                self.check_python_version()
+                self.check_env_file()
+                self.check_directories()
+                self.check_docker(docker_probe)
+                self.check_postgres(postgres_probe)
         
         if install_deps:
             self.install_dependencies()
@@ -235,12 +477,31 @@ stat_foot:
             self.print_info("\nSkipping dependency installation")
             self.print_info("Run with --install flag to install dependencies")
         
-        self.create_dbt_profiles()
+        if self.mode != 'structure':
+            self.create_dbt_profiles()
         self.print_summary()
+        
+        if not self.failed_log:
+            self.setup_marker.write_text(json.dumps(self.setup_fingerprint(), indent=2))
 
 
 if __name__ == "__main__":
     install_deps = '--install' in sys.argv
+    force = '--force' in sys.argv
+    mode = next(
+        (arg.split('=', 1)[1] for arg in sys.argv if arg.startswith('--check-only=')),
+        None
+    )
+    if mode is not None and mode not in CHECK_ONLY_MODES:
+        # A typo must not fall through to the full setup under its own marker
+        sys.stderr.write(
+            f"Unknown --check-only mode: {mode!r} (expected: {', '.join(CHECK_ONLY_MODES)})\n{__doc__}"
+        )
+        sys.exit(2)
     
-    setup = SetupManager()
-    setup.run(install_deps=install_deps)
+    setup = SetupManager(mode=mode)
+    if '--compile-lock' in sys.argv:
+        setup.compile_lock()
+        setup.flush_output()
+    else:
+        setup.run(install_deps=install_deps, force=force)